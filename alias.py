@@ -0,0 +1,64 @@
+from functools import lru_cache
+
+
+class AliasTable():
+    """A sampler over a fixed categorical distribution using Vose's alias method, so
+    each sample takes a single random number and constant time however many
+    outcomes there are.
+    """
+
+    def __init__(self, distribution):
+        """Build the table.
+
+        Args:
+            distribution (dict): Each outcome mapped to its probability (float).
+        """
+        self.outcomes = list(distribution)
+        size = len(self.outcomes)
+        scaled = [probability * size for probability in distribution.values()]
+        self.probabilities = [1.0] * size
+        self.aliases = list(range(size))
+        small = [index for index, value in enumerate(scaled) if value < 1]
+        large = [index for index, value in enumerate(scaled) if value >= 1]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            self.probabilities[less] = scaled[less]
+            self.aliases[less] = more
+            scaled[more] -= 1 - scaled[less]
+            (small if scaled[more] < 1 else large).append(more)
+        # Anything left over only differs from 1 by rounding, so keeps probability 1
+
+    def sample(self, rng):
+        """Draw one outcome.
+
+        Args:
+            rng (random.Random): The random number generator.
+
+        Returns:
+            object: The outcome.
+        """
+        position = rng.random() * len(self.outcomes)
+        # Rounding can put the position at the very end of the table
+        index = min(int(position), len(self.outcomes) - 1)
+        if position - index >= self.probabilities[index]:
+            index = self.aliases[index]
+        return self.outcomes[index]
+
+
+@lru_cache(maxsize=None)
+def exploded_table(num_dice, is_hexed):
+    """Get the alias table for the face counts of an initial roll after its crits
+    explode, which is built once and shared by every player, so the roll and the
+    explosion take a single draw.
+
+    Args:
+        num_dice (int): The number of dice being rolled initially.
+        is_hexed (bool): Whether the hex condition is applied, so crits don't explode.
+
+    Returns:
+        AliasTable: The table, whose outcomes are face-count vectors.
+    """
+    # The exact engine is only needed to build a table
+    from exact import exploded_distribution
+    return AliasTable(exploded_distribution(num_dice, is_hexed))
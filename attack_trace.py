@@ -0,0 +1,77 @@
+class AttackTrace():
+    """A structured record of the phases of a single attack. Events are stored as
+    plain dicts and only formatted to text when the log is requested.
+    """
+
+    # Phases after which only the defender's dice can have changed
+    DEFENDER_ONLY_PHASES = ('cover applied', 'pierce applied')
+
+    def __init__(self):
+        """Initialise an empty trace.
+        """
+        self.events = []
+        self.damage = None
+        self.combo = None
+
+    def record_pools(self, phase, attacker, defender, damage):
+        """Record the dice pools after a phase.
+
+        Args:
+            phase (str): The phase of the attack, e.g. 'initial roll'.
+            attacker (Attacker): The Attacker object.
+            defender (Defender): The Defender object.
+            damage (int): The damage being dealt so far.
+        """
+        # The attacker's dice are not modified by the cover and pierce phases
+        if phase not in self.DEFENDER_ONLY_PHASES:
+            self.events.append({'phase': phase, 'side': 'attacker',
+                                'pool': list(attacker.dice_pool), 'damage': damage})
+        self.events.append({'phase': phase, 'side': 'defender',
+                            'pool': list(defender.dice_pool), 'damage': damage})
+
+    def record_current_damage(self, damage):
+        """Record the current damage including the future application of cover.
+
+        Args:
+            damage (int): The current damage.
+        """
+        self.events.append({'phase': 'current damage', 'side': None, 'pool': None,
+                            'damage': damage})
+
+    def record_result(self, damage, combo, has_combo):
+        """Record the result of the attack.
+
+        Args:
+            damage (int): The final damage dealt.
+            combo (bool): Whether the combo was achieved.
+            has_combo (bool): Whether the attacker was looking for a combo.
+        """
+        self.damage = damage
+        self.combo = combo if has_combo else None
+
+    def to_dict(self):
+        """Get the trace as a JSON-serialisable dict.
+
+        Returns:
+            dict: The events, final damage and combo result (None if no combo).
+        """
+        return {'events': self.events, 'damage': self.damage, 'combo': self.combo}
+
+    def format(self):
+        """Format the trace as the text log produced by Simulation.generate_single.
+
+        Returns:
+            str: The log of the attack.
+        """
+        lines = []
+        for event in self.events:
+            if event['phase'] == 'current damage':
+                lines.append('Current Damage Output (inc future cover application): '
+                             f'{event["damage"]}')
+            else:
+                lines.append(f'{event["side"].capitalize()} dice pool after '
+                             f'{event["phase"]}: {event["pool"]}')
+        lines.append(f'Final Damage Output: {self.damage}')
+        if self.combo is not None:
+            lines.append(f'Combo Achieved: {self.combo}')
+        return '\n'.join(lines)
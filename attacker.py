@@ -1,5 +1,4 @@
-from collections import Counter
-
+from faces import FACE_INDEX, to_counts
 from player import Player
 
 
@@ -12,7 +11,9 @@ class Attacker(Player):
 
     def __init__(self, num_dice, num_rerolls=0, can_reroll_skulls=False,
                  dr_strange_reroll=(False, 0), is_hexed=False, counts_blanks=False,
-                 counts_skulls=False, pierce_on_wild=False, combo=([], True)):
+                 counts_skulls=False, pierce_on_wild=False, combo=([], True),
+                 tracked_combos=None, use_face_counts=False,
+                 use_alias_tables=False, rng=None):
         """Take parent params plus attacker-specific pierce_on_wild and combo params.
 
         Args:
@@ -35,10 +36,22 @@ class Attacker(Player):
             combo (tuple, optional): A combo that is being looked for (list) and
                 whether we want to reroll achieved combos to seek more successes (bool).
                 Defaults to ([], True).
+            tracked_combos (list[list[str]], optional): Further combos whose success
+                is reported but which don't affect any rerolls. Defaults to None.
+            use_face_counts (bool, optional): Whether the dice pool is stored as a
+                face-count vector instead of a list, with dice rolled, rerolled and
+                counted as whole faces. Defaults to False.
+            use_alias_tables (bool, optional): Whether the initial roll and the
+                explosion of its crits are drawn at once from a precomputed alias
+                table over the face counts after the explosion, so explode_crits
+                does nothing. Defaults to False.
+            rng (random.Random, optional): The random number generator used to roll
+                dice. Defaults to None, which uses the global random module.
         """
         # Call parent constructor
         super().__init__(num_dice, num_rerolls, can_reroll_skulls,
-                         dr_strange_reroll, is_hexed, counts_blanks, counts_skulls)
+                         dr_strange_reroll, is_hexed, counts_blanks, counts_skulls,
+                         use_face_counts, use_alias_tables, rng)
 
         # Add the attacker-specific params to the parent's status dictionary
         self.status['pierce_on_wild'] = pierce_on_wild
@@ -46,6 +59,12 @@ class Attacker(Player):
         # Attacker-specific combo params
         self.combo = combo[0]
         self.rerolls_combos = combo[1]
+        # The number of each result required for the combo, as a face-count vector
+        self.combo_vector = to_counts(self.combo)
+        # Further combos and their face-count vectors, compiled once so checking many
+        # combos only counts the dice pool once
+        self.tracked_combos = [list(combo) for combo in tracked_combos or []]
+        self.tracked_vectors = [to_counts(combo) for combo in self.tracked_combos]
 
         # Add attacker-specific hit to the parent's success results list
         self.success_results.append('hit')
@@ -71,6 +90,32 @@ class Attacker(Player):
             text += f'\nLooking for combo {self.combo}'
         return text
 
+    def get_config(self):
+        """Call parent function and add the attacker-specific params.
+
+        Returns:
+            dict: The constructor parameters by name.
+        """
+        config = super().get_config()
+        config['pierce_on_wild'] = self.status['pierce_on_wild']
+        config['combo'] = (list(self.combo), self.rerolls_combos)
+        # Tracked combos are left out as they don't change how the dice are resolved
+        return config
+
+    def get_config_key(self):
+        """Call parent function with the combo in a canonical form.
+
+        Returns:
+            tuple: The player type and its sorted constructor parameters.
+        """
+        player_type, config = super().get_config_key()
+        config = dict(config)
+        # The order of the combo doesn't matter, and whether it is rerolled only
+        # matters if there is one
+        combo, rerolls_combos = config['combo']
+        config['combo'] = (tuple(sorted(combo)), rerolls_combos or not combo)
+        return (player_type, tuple(sorted(config.items())))
+
     def decide_dr_strange_reroll(self, current_damage):
         """Call parent function with attacker flag if combo situation allows.
 
@@ -88,6 +133,14 @@ class Attacker(Player):
     def reroll(self):
         """Call parent function with a list of failure results that can be rerolled.
         """
+        # A face-count pool rerolls by face, keeping any dice needed for the combo
+        if self.use_face_counts:
+            if len(self.combo) > 0 and not self.rerolls_combos and self.check_combo():
+                self._reroll_counts(self.combo_vector)
+            else:
+                self._reroll_counts()
+            return
+
         # Get all rerollable failure results from the dice pool
         failures = [result for result in self.dice_pool
                     if result in self.rerollable_fails]
@@ -96,7 +149,15 @@ class Attacker(Player):
         # achieved
         if len(self.combo) > 0 and not self.rerolls_combos and self.check_combo():
             # Remove any combo successes from list of rerollable failures
-            failures = list((Counter(failures) - Counter(self.combo)).elements())
+            protected = list(self.combo_vector)
+            unprotected = []
+            for result in failures:
+                index = FACE_INDEX[result]
+                if protected[index] > 0:
+                    protected[index] -= 1
+                else:
+                    unprotected.append(result)
+            failures = unprotected
 
         super().reroll(failures)
 
@@ -111,4 +172,37 @@ class Attacker(Player):
         Returns:
             bool: Whether the combo has been achieved.
         """
-        return not (Counter(self.combo) - Counter(self.dice_pool))
+        return _meets(self._get_face_counts(), self.combo_vector)
+
+    def check_tracked_combos(self):
+        """Check the dice pool for each of the tracked combos.
+
+        Returns:
+            list[bool]: Whether each tracked combo has been achieved.
+        """
+        counts = self._get_face_counts()
+        return [_meets(counts, vector) for vector in self.tracked_vectors]
+
+    def _get_face_counts(self):
+        """Get the number of each face in the dice pool.
+
+        Returns:
+            list[int]: The face-count vector of the dice pool.
+        """
+        # The face-count pool already holds its counts
+        if self.use_face_counts:
+            return self.dice_pool.counts
+        return to_counts(self.dice_pool)
+
+
+def _meets(counts, required):
+    """Check whether a face-count vector has at least the required faces.
+
+    Args:
+        counts (list[int]): A face-count vector.
+        required (tuple[int]): The required face-count vector.
+
+    Returns:
+        bool: Whether every face is present at least as many times as required.
+    """
+    return all(have >= need for have, need in zip(counts, required))
@@ -0,0 +1,391 @@
+import numpy as np
+
+from faces import FACES, FACE_INDEX, SIDE_FACES, to_counts
+from pipeline import STEPS, compile_batch
+
+# Face-count vector positions used by the batch engine
+CRIT, WILD, HIT, BLOCK, BLANK, SKULL = (FACE_INDEX[face] for face in FACES)
+
+
+class BatchEngine():
+    """A vectorised engine that resolves many attacks at once. Each dice pool is held
+    as a row of a (num_sims, 6) face-count array and every phase of the attack is
+    applied to all rows together, giving the same distribution of results as
+    Simulation._resolve_attack. The phases are the batch implementations of the
+    pipeline's steps, so only the steps needed for the players are run.
+    """
+
+    # The largest number of attacks resolved in one set of arrays
+    CHUNK_SIZE = 1000000
+
+    def __init__(self, attacker, defender, seed=None, steps=None):
+        """Initialise the engine.
+
+        Args:
+            attacker (Attacker): The Attacker object.
+            defender (Defender): The Defender object.
+            seed (int, optional): The seed for the NumPy random generator.
+                Defaults to None.
+            steps (tuple[Step], optional): The steps of the attack. Defaults to None,
+                which uses pipeline.STEPS.
+        """
+        self.attacker = attacker
+        self.defender = defender
+        self.rng = np.random.default_rng(seed)
+
+        # Lookup table from a side of the die to its face index
+        self._side_faces = np.array(SIDE_FACES, dtype=np.int8)
+
+        # Masks of the faces which count as successes for each player
+        self._attacker_successes = self._face_mask(attacker.success_results)
+        self._defender_successes = self._face_mask(defender.success_results)
+
+        # Face indices of the rerollable fails in preferred reroll order
+        self._attacker_fails = [FACE_INDEX[face] for face in attacker.rerollable_fails]
+        self._defender_fails = [FACE_INDEX[face] for face in defender.rerollable_fails]
+
+        # Required face counts for the combo (if provided)
+        self._combo = np.array(to_counts(attacker.combo), dtype=np.int32)
+
+        # The batch implementations of the steps needed for these players
+        self._steps = compile_batch(STEPS if steps is None else steps, self)
+
+    def run(self, num_sims):
+        """Resolve a number of attacks.
+
+        Args:
+            num_sims (int): The number of attacks to resolve.
+
+        Returns:
+            tuple[ndarray]: The damage dealt by each attack (int) and whether the
+                combo was achieved in each attack (bool).
+        """
+        damage = np.empty(num_sims, dtype=np.int32)
+        combos = np.empty(num_sims, dtype=bool)
+        start = 0
+        for chunk_damage, chunk_combos in self.iter_chunks(num_sims):
+            stop = start + len(chunk_damage)
+            damage[start:stop], combos[start:stop] = chunk_damage, chunk_combos
+            start = stop
+        return damage, combos
+
+    def iter_chunks(self, num_sims):
+        """Resolve a number of attacks one chunk at a time.
+
+        Args:
+            num_sims (int): The number of attacks to resolve.
+
+        Yields:
+            tuple[ndarray]: The damage dealt and whether the combo was achieved for
+                each attack in the chunk.
+        """
+        for start in range(0, num_sims, self.CHUNK_SIZE):
+            yield self._resolve_attacks(min(self.CHUNK_SIZE, num_sims - start))
+
+    def accumulate(self, num_sims, accumulator):
+        """Resolve a number of attacks and count the results into an accumulator
+        without keeping them.
+
+        Args:
+            num_sims (int): The number of attacks to resolve.
+            accumulator (ResultAccumulator): The accumulator to add the results to.
+        """
+        for damage, combos in self.iter_chunks(num_sims):
+            accumulator.add_counts(np.bincount(damage).tolist(),
+                                   np.bincount(damage[combos]).tolist())
+
+    def _resolve_attacks(self, num_sims):
+        """Resolve a set of attacks held in one set of arrays by running each compiled
+        step in turn.
+
+        Args:
+            num_sims (int): The number of attacks to resolve.
+
+        Returns:
+            tuple[ndarray]: The damage dealt and whether the combo was achieved.
+        """
+        state = {'num_sims': num_sims, 'combos': np.zeros(num_sims, dtype=bool)}
+        for step in self._steps:
+            step(state)
+        damage = self._calculate_damage(state['attack'], state['defence'])
+        return damage, state['combos']
+
+    # ------------------------------
+    # Steps of the attack
+    # ------------------------------
+
+    def _roll_attacker(self, state):
+        """Roll the attacker's initial dice pools.
+
+        Args:
+            state (dict): The chunk's number of attacks and dice pools.
+        """
+        state['attack'] = self._roll(state['num_sims'], self.attacker.num_dice)
+
+    def _roll_defender(self, state):
+        """Roll the defender's initial dice pools.
+
+        Args:
+            state (dict): The chunk's number of attacks and dice pools.
+        """
+        state['defence'] = self._roll(state['num_sims'], self.defender.num_dice)
+
+    def _explode_attacker_crits(self, state):
+        """Roll a new die for each of the attacker's crits.
+
+        Args:
+            state (dict): The chunk's number of attacks and dice pools.
+        """
+        attack_pool = state['attack']
+        attack_pool += self._roll(state['num_sims'], attack_pool[:, CRIT])
+
+    def _explode_defender_crits(self, state):
+        """Roll a new die for each of the defender's crits.
+
+        Args:
+            state (dict): The chunk's number of attacks and dice pools.
+        """
+        defence_pool = state['defence']
+        defence_pool += self._roll(state['num_sims'], defence_pool[:, CRIT])
+
+    def _attacker_dr_strange_reroll(self, state):
+        """Resolve the attacker's Dr Strange reroll decisions.
+
+        Args:
+            state (dict): The chunk's number of attacks and dice pools.
+        """
+        attacker = self.attacker
+        attack_pool = state['attack']
+        may_reroll = np.ones(state['num_sims'], dtype=bool)
+        if len(attacker.combo) > 0 and not attacker.rerolls_combos:
+            may_reroll = ~self._check_combo(attack_pool)
+        current_damage = self._calculate_current_damage(attack_pool, state['defence'])
+        self._dr_strange_reroll(attack_pool, attacker, self._attacker_successes,
+                                current_damage, may_reroll, 'attacker')
+
+    def _attacker_reroll(self, state):
+        """Resolve the attacker's standard rerolls.
+
+        Args:
+            state (dict): The chunk's number of attacks and dice pools.
+        """
+        attacker = self.attacker
+        attack_pool = state['attack']
+        protected = None
+        if len(attacker.combo) > 0 and not attacker.rerolls_combos:
+            protected = np.where(self._check_combo(attack_pool)[:, None],
+                                 self._combo, 0)
+        self._reroll(attack_pool, attacker.num_rerolls, self._attacker_fails,
+                     protected)
+
+    def _defender_dr_strange_reroll(self, state):
+        """Resolve the defender's Dr Strange reroll decisions.
+
+        Args:
+            state (dict): The chunk's number of attacks and dice pools.
+        """
+        current_damage = self._calculate_current_damage(state['attack'],
+                                                        state['defence'])
+        self._dr_strange_reroll(state['defence'], self.defender,
+                                self._defender_successes, current_damage,
+                                np.ones(state['num_sims'], dtype=bool), 'defender')
+
+    def _defender_reroll(self, state):
+        """Resolve the defender's standard rerolls.
+
+        Args:
+            state (dict): The chunk's number of attacks and dice pools.
+        """
+        self._reroll(state['defence'], self.defender.num_rerolls, self._defender_fails)
+
+    def _apply_cover(self, state):
+        """Apply cover to the defender's dice.
+
+        Args:
+            state (dict): The chunk's number of attacks and dice pools.
+        """
+        self._change_first(state['defence'], np.ones(state['num_sims'], dtype=bool),
+                           [HIT, BLANK], BLOCK)
+
+    def _apply_pierce(self, state):
+        """Apply pierce to the defender's dice where the attacker rolled a wild.
+
+        Args:
+            state (dict): The chunk's number of attacks and dice pools.
+        """
+        self._change_first(state['defence'], state['attack'][:, WILD] > 0,
+                           [CRIT, WILD, BLOCK], BLANK)
+
+    def _check_combos(self, state):
+        """Check whether the combo has been achieved in each attack.
+
+        Args:
+            state (dict): The chunk's number of attacks and dice pools.
+        """
+        state['combos'] = self._check_combo(state['attack'])
+
+    # ------------------------------
+    # Helpers
+    # ------------------------------
+
+    def _face_mask(self, results):
+        """Build an integer mask of the faces in a list of results.
+
+        Args:
+            results (list[str]): The results to mark, e.g. a player's successes.
+
+        Returns:
+            ndarray: 1 for each face in the results and 0 otherwise.
+        """
+        return np.array([int(face in results) for face in FACES], dtype=np.int32)
+
+    def _roll(self, num_sims, num_dice):
+        """Roll a number of dice for each attack and count the faces.
+
+        Args:
+            num_sims (int): The number of attacks.
+            num_dice (int or ndarray): The number of dice to roll for every attack,
+                or for each attack individually.
+
+        Returns:
+            ndarray: A (num_sims, 6) array of face counts.
+        """
+        max_dice = int(np.max(num_dice)) if np.ndim(num_dice) else num_dice
+        counts = np.zeros((num_sims, len(FACES)), dtype=np.int32)
+        if max_dice == 0:
+            return counts
+        faces = self._side_faces[self.rng.integers(0, len(SIDE_FACES),
+                                                   size=(num_sims, max_dice))]
+        # Only keep the dice actually rolled for each attack
+        if np.ndim(num_dice):
+            faces[np.arange(max_dice) >= np.asarray(num_dice)[:, None]] = -1
+        for face in range(len(FACES)):
+            counts[:, face] = np.count_nonzero(faces == face, axis=1)
+        return counts
+
+    def _successes(self, pool, success_mask):
+        """Count the successes in each dice pool.
+
+        Args:
+            pool (ndarray): A (num_sims, 6) array of face counts.
+            success_mask (ndarray): The player's success face mask.
+
+        Returns:
+            ndarray: The number of successes for each attack.
+        """
+        return pool @ success_mask
+
+    def _calculate_damage(self, attack_pool, defence_pool):
+        """Calculate the damage dealt for each attack.
+
+        Args:
+            attack_pool (ndarray): The attacker's face counts.
+            defence_pool (ndarray): The defender's face counts.
+
+        Returns:
+            ndarray: The damage dealt (minimum of 0).
+        """
+        damage = (self._successes(attack_pool, self._attacker_successes) -
+                  self._successes(defence_pool, self._defender_successes))
+        return np.maximum(damage, 0)
+
+    def _calculate_current_damage(self, attack_pool, defence_pool):
+        """Calculate the current damage for each attack including the potential for
+        future application of cover and pierce, as in
+        Simulation._calculate_current_damage.
+
+        Args:
+            attack_pool (ndarray): The attacker's face counts.
+            defence_pool (ndarray): The defender's face counts.
+
+        Returns:
+            ndarray: The current damage (minimum of 0).
+        """
+        current_damage = self._calculate_damage(attack_pool, defence_pool)
+        cover_applied = np.zeros(len(attack_pool), dtype=bool)
+        if self.defender.status['has_cover']:
+            cover_applied = (defence_pool[:, HIT] > 0) | (defence_pool[:, BLANK] > 0)
+            current_damage = current_damage - cover_applied
+        if self.attacker.status['pierce_on_wild']:
+            defence_successes = self._successes(defence_pool, self._defender_successes)
+            current_damage = current_damage + ((attack_pool[:, WILD] > 0) &
+                                               ((defence_successes > 0) |
+                                                cover_applied))
+        return np.maximum(current_damage, 0)
+
+    def _check_combo(self, attack_pool):
+        """Check whether the combo has been achieved in each attack.
+
+        Args:
+            attack_pool (ndarray): The attacker's face counts.
+
+        Returns:
+            ndarray: Whether the combo has been achieved.
+        """
+        return np.all(attack_pool >= self._combo, axis=1)
+
+    def _dr_strange_reroll(self, pool, player, success_mask, current_damage,
+                           may_reroll, player_type):
+        """Apply the Dr Strange reroll decision to each attack and completely reroll
+        the dice pools where it is met, as in Player.decide_dr_strange_reroll.
+
+        Args:
+            pool (ndarray): The player's face counts, updated in place.
+            player (Player): The player making the decision.
+            success_mask (ndarray): The player's success face mask.
+            current_damage (ndarray): The current damage for each attack.
+            may_reroll (ndarray): Whether the player is allowed to reroll.
+            player_type (str): Whether the player is an 'attacker' or 'defender'.
+        """
+        successes = self._successes(pool, success_mask)
+        pool_size = pool.sum(axis=1)
+        # Only reroll if all dice aren't already successes
+        reroll = may_reroll & (successes < pool_size)
+        if player.dr_strange_reroll_threshold > -1:
+            if player_type == 'attacker':
+                reroll &= current_damage < player.dr_strange_reroll_threshold
+            else:
+                reroll &= current_damage > player.dr_strange_reroll_threshold
+        else:
+            # Empty pools are already excluded above
+            with np.errstate(divide='ignore', invalid='ignore'):
+                reroll &= successes / pool_size < player.success_rate
+        if np.any(reroll):
+            pool[reroll] = self._roll(int(np.count_nonzero(reroll)), pool_size[reroll])
+
+    def _reroll(self, pool, num_rerolls, fails, protected=None):
+        """Apply standard rerolls to each attack, as in Player.reroll.
+
+        Args:
+            pool (ndarray): The player's face counts, updated in place.
+            num_rerolls (int): The number of standard rerolls available.
+            fails (list[int]): The rerollable fail faces in preferred reroll order.
+            protected (ndarray, optional): Face counts for each attack which must not
+                be rerolled (e.g. an achieved combo). Defaults to None.
+        """
+        remaining = np.full(len(pool), num_rerolls, dtype=np.int32)
+        for face in fails:
+            available = pool[:, face]
+            if protected is not None:
+                available = np.maximum(available - protected[:, face], 0)
+            taken = np.minimum(available, remaining)
+            pool[:, face] -= taken
+            remaining -= taken
+        pool += self._roll(len(pool), num_rerolls - remaining)
+
+    def _change_first(self, pool, active, old_faces, new_face):
+        """Change one die in each active dice pool to a new face, taking the first
+        old face present in order of preference.
+
+        Args:
+            pool (ndarray): The face counts, updated in place.
+            active (ndarray): Whether the change applies to each attack.
+            old_faces (list[int]): The faces to change in order of preference.
+            new_face (int): The face to change to.
+        """
+        pending = active.copy()
+        for face in old_faces:
+            changed = pending & (pool[:, face] > 0)
+            pool[changed, face] -= 1
+            pool[changed, new_face] += 1
+            pending &= ~changed
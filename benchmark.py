@@ -0,0 +1,245 @@
+import argparse
+import json
+import os
+import sys
+import time
+import timeit
+import tracemalloc
+
+from simulation import Simulation
+from attacker import Attacker
+from defender import Defender
+
+# Representative attacker and defender configurations
+CONFIGS = {
+    # The setup from examples.py
+    'example': (dict(num_dice=6, num_rerolls=1, combo=(['hit', 'crit', 'wild'], True)),
+                dict(num_dice=3, has_cover=True)),
+    # Many dice with several standard rerolls on both sides
+    'heavy_reroll': (dict(num_dice=10, num_rerolls=4, can_reroll_skulls=True),
+                     dict(num_dice=8, num_rerolls=3, can_reroll_skulls=True)),
+    # Dr Strange rerolls with the success rate heuristic on both sides
+    'dr_strange': (dict(num_dice=7, num_rerolls=1, dr_strange_reroll=(True, -1),
+                        pierce_on_wild=True),
+                   dict(num_dice=5, dr_strange_reroll=(True, -1), has_cover=True)),
+    # A combo which is kept rather than rerolled
+    'combo': (dict(num_dice=8, num_rerolls=3, dr_strange_reroll=(True, 4),
+                   combo=(['hit', 'hit', 'crit', 'wild'], False)),
+              dict(num_dice=4, num_rerolls=1)),
+}
+
+# The number of sims for each generate_results run
+SIM_COUNTS = [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7]
+
+# The least time spent timing each hot path, in seconds
+MIN_TIME = 0.2
+
+# The default file holding the stored baseline
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'benchmark_baseline.json')
+
+
+def build_simulation(config_name):
+    """Build a fresh simulation for a named configuration.
+
+    Args:
+        config_name (str): The name of the configuration in CONFIGS.
+
+    Returns:
+        Simulation: The simulation.
+    """
+    attacker_params, defender_params = CONFIGS[config_name]
+    return Simulation(Attacker(**attacker_params), Defender(**defender_params))
+
+
+def bench_hot_paths(config_name, num_states=2000):
+    """Time each hot path of an attack separately. Paths which work on a rolled dice
+    pool are timed over pools prepared beforehand, so rolling them isn't timed.
+
+    Args:
+        config_name (str): The name of the configuration in CONFIGS.
+        num_states (int, optional): The number of prepared dice pools.
+            Defaults to 2000.
+
+    Returns:
+        dict: Each hot path mapped to its calls per second.
+    """
+    sim = build_simulation(config_name)
+    attacker = sim.attacker
+
+    def prepare(explode):
+        pools = []
+        for _ in range(num_states):
+            attacker.initial_roll()
+            if explode:
+                attacker.explode_crits()
+            pools.append(attacker.dice_pool)
+        return pools
+
+    def call_rate(method, explode=None):
+        # Methods which need a rolled pool are given a fresh one for each call
+        total = 0.0
+        calls = 0
+        while total < MIN_TIME:
+            if explode is None:
+                start = time.perf_counter()
+                for _ in range(num_states):
+                    method()
+            else:
+                pools = prepare(explode)
+                start = time.perf_counter()
+                for pool in pools:
+                    attacker.dice_pool = pool
+                    method()
+            total += time.perf_counter() - start
+            calls += num_states
+        return calls / total
+
+    return {
+        'initial_roll': call_rate(attacker.initial_roll),
+        'explode_crits': call_rate(attacker.explode_crits, explode=False),
+        'reroll': call_rate(attacker.reroll, explode=True),
+        'get_successes': call_rate(attacker.get_successes, explode=True),
+        'check_combo': call_rate(attacker.check_combo, explode=True),
+        '_resolve_attack': call_rate(sim._resolve_attack),
+    }
+
+
+def bench_generate_results(config_name, num_sims, engine, measure_memory=True):
+    """Time generate_results and optionally measure its peak memory.
+
+    Args:
+        config_name (str): The name of the configuration in CONFIGS.
+        num_sims (int): The number of sims.
+        engine (str): The engine passed to generate_results.
+        measure_memory (bool, optional): Whether to measure peak memory in a second
+            traced run. Defaults to True.
+
+    Returns:
+        dict: The sims per second and, if measured, the peak memory in bytes.
+    """
+    sim = build_simulation(config_name)
+    elapsed = timeit.timeit(lambda: sim.generate_results(num_sims, engine), number=1)
+    result = {'sims_per_second': num_sims / elapsed}
+    if measure_memory:
+        # Tracing slows the run down, so memory is measured separately
+        tracemalloc.start()
+        sim.generate_results(num_sims, engine)
+        result['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+
+def run(max_scalar_sims, max_batch_sims, measure_memory):
+    """Run every benchmark.
+
+    Args:
+        max_scalar_sims (int): The largest number of sims for the scalar engine.
+        max_batch_sims (int): The largest number of sims for the batch engine.
+        measure_memory (bool): Whether to measure peak memory.
+
+    Returns:
+        dict: Each benchmark name mapped to its measurements.
+    """
+    engines = {'scalar': max_scalar_sims}
+    try:
+        import numpy  # noqa: F401
+        engines['batch'] = max_batch_sims
+    except ImportError:
+        print('NumPy is not installed, skipping the batch engine')
+
+    results = {}
+    for config_name in CONFIGS:
+        for path, rate in bench_hot_paths(config_name).items():
+            name = f'{config_name}/{path}'
+            results[name] = {'calls_per_second': rate}
+            print(f'{name}: {rate:,.0f} calls/s')
+        for engine, max_sims in engines.items():
+            for num_sims in SIM_COUNTS:
+                if num_sims > max_sims:
+                    continue
+                name = f'{config_name}/generate_results/{engine}/{num_sims}'
+                results[name] = bench_generate_results(config_name, num_sims, engine,
+                                                       measure_memory)
+                text = f'{name}: {results[name]["sims_per_second"]:,.0f} sims/s'
+                if 'peak_bytes' in results[name]:
+                    text += f', peak {results[name]["peak_bytes"] / 2 ** 20:.1f} MiB'
+                print(text)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Compare results against a baseline and list the regressions.
+
+    Args:
+        results (dict): The new measurements.
+        baseline (dict): The stored measurements.
+        tolerance (float): The allowed fractional slowdown or memory increase.
+
+    Returns:
+        list[str]: A description of each regression.
+    """
+    regressions = []
+    for name, measurements in results.items():
+        if name not in baseline:
+            continue
+        for metric, value in measurements.items():
+            old_value = baseline[name].get(metric)
+            if old_value is None:
+                continue
+            # Rates should not fall and memory should not grow
+            if metric == 'peak_bytes':
+                change = value / old_value - 1
+            else:
+                change = old_value / value - 1
+            if change > tolerance:
+                regressions.append(f'{name} {metric}: {old_value:,.0f} -> '
+                                   f'{value:,.0f} ({change:+.0%})')
+    return regressions
+
+
+def main():
+    """Run the benchmarks from the command line and compare them with the stored
+    baseline, or store them as the new baseline.
+
+    Returns:
+        int: The exit status, 1 if any benchmark regressed beyond the tolerance and
+            0 otherwise.
+    """
+    parser = argparse.ArgumentParser(description='Benchmark the simulation hot paths.')
+    parser.add_argument('--baseline', default=BASELINE_PATH,
+                        help='the stored baseline file')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='store these results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='the allowed fractional regression (default 0.2)')
+    parser.add_argument('--max-scalar-sims', type=int, default=10 ** 5,
+                        help='the largest sim count for the scalar engine')
+    parser.add_argument('--max-batch-sims', type=int, default=10 ** 7,
+                        help='the largest sim count for the batch engine')
+    parser.add_argument('--no-memory', action='store_true',
+                        help="don't measure peak memory")
+    args = parser.parse_args()
+
+    results = run(args.max_scalar_sims, args.max_batch_sims, not args.no_memory)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+        print(f'Saved baseline to {args.baseline}')
+        return 0
+    if not os.path.exists(args.baseline):
+        print('No baseline found, run with --save-baseline to store one')
+        return 0
+    with open(args.baseline) as file:
+        regressions = compare(results, json.load(file), args.tolerance)
+    if regressions:
+        print('\n-----REGRESSIONS-----')
+        print('\n'.join(regressions))
+        return 1
+    print('\nNo regressions against the baseline')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+import shelve
+from collections import OrderedDict
+
+
+class ResultCache():
+    """A bounded least-recently-used cache of result distributions keyed by canonical
+    configuration keys, with an optional on-disk store so results survive process
+    restarts.
+    """
+
+    def __init__(self, maxsize=128, path=None):
+        """Initialise the cache.
+
+        Args:
+            maxsize (int, optional): The largest number of results kept in memory.
+                Defaults to 128.
+            path (str, optional): The file to store results on disk, or None to only
+                keep them in memory. Defaults to None.
+        """
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._store = shelve.open(path) if path is not None else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __contains__(self, key):
+        return key in self._entries or (self._store is not None and
+                                        repr(key) in self._store)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        """Get a cached result, loading it from disk if it isn't in memory.
+
+        Args:
+            key (tuple): The canonical configuration key.
+            default (optional): The value returned if the key isn't cached.
+                Defaults to None.
+
+        Returns:
+            The cached result, or the default.
+        """
+        if key in self._entries:
+            # Mark the entry as most recently used
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        if self._store is not None and repr(key) in self._store:
+            value = self._store[repr(key)]
+            self._remember(key, value)
+            return value
+        return default
+
+    def put(self, key, value):
+        """Add a result to the cache and, if used, the on-disk store.
+
+        Args:
+            key (tuple): The canonical configuration key.
+            value: The result to cache.
+        """
+        self._remember(key, value)
+        if self._store is not None:
+            # Keys are stored by their repr, which is stable for tuples of plain values
+            self._store[repr(key)] = value
+            self._store.sync()
+
+    def get_or_compute(self, key, compute):
+        """Get a cached result, computing and caching it if it isn't cached.
+
+        Args:
+            key (tuple): The canonical configuration key.
+            compute (callable): A function with no arguments that computes the result.
+
+        Returns:
+            The cached or newly computed result.
+        """
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def close(self):
+        """Close the on-disk store, if used.
+        """
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+
+    def _remember(self, key, value):
+        """Add a result to memory, evicting the least recently used if full.
+
+        Args:
+            key (tuple): The canonical configuration key.
+            value: The result to cache.
+        """
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
@@ -0,0 +1,208 @@
+import argparse
+import sys
+
+from simulation import Simulation
+from attacker import Attacker
+from defender import Defender
+
+
+def add_player_arguments(parser, player_type):
+    """Add the constructor parameters shared by both players, prefixed by the player
+    type (e.g. --attacker-dice).
+
+    Args:
+        parser (argparse.ArgumentParser): The parser to add to.
+        player_type (str): Whether the player is an 'attacker' or 'defender'.
+
+    Returns:
+        argparse._ArgumentGroup: The group, for adding player-specific parameters.
+    """
+    group = parser.add_argument_group(f'{player_type} options')
+    prefix = f'--{player_type}'
+    group.add_argument(f'{prefix}-dice', type=int, required=True,
+                       help='the number of dice being rolled initially')
+    group.add_argument(f'{prefix}-rerolls', type=int, default=0,
+                       help='the number of standard rerolls available')
+    group.add_argument(f'{prefix}-reroll-skulls', action='store_true',
+                       help='skulls can be rerolled during standard rerolls')
+    group.add_argument(f'{prefix}-dr-strange', type=int, nargs='?', const=-1,
+                       metavar='THRESHOLD',
+                       help='allow a Dr Strange reroll, with an optional damage '
+                            'threshold (default: expected success rate)')
+    group.add_argument(f'{prefix}-hexed', action='store_true',
+                       help='the hex condition is applied')
+    group.add_argument(f'{prefix}-counts-blanks', action='store_true',
+                       help='blanks are counted as successes')
+    group.add_argument(f'{prefix}-counts-skulls', action='store_true',
+                       help='skulls are counted as successes')
+    return group
+
+
+def build_parser():
+    """Build the command-line argument parser.
+
+    Returns:
+        argparse.ArgumentParser: The parser.
+    """
+    parser = argparse.ArgumentParser(
+        description='Simulate Marvel Crisis Protocol attacks.')
+    attacker_group = add_player_arguments(parser, 'attacker')
+    attacker_group.add_argument('--attacker-pierce', action='store_true',
+                                help='pierce is applied if a wild result is rolled')
+    attacker_group.add_argument('--attacker-combo', nargs='+', default=[],
+                                metavar='RESULT',
+                                help='a combo being looked for, e.g. hit crit wild')
+    attacker_group.add_argument('--attacker-keep-combo', action='store_true',
+                                help="don't reroll an achieved combo")
+    defender_group = add_player_arguments(parser, 'defender')
+    defender_group.add_argument('--defender-cover', action='store_true',
+                                help='cover is applied')
+
+    parser.add_argument('--sims', type=int, default=10000,
+                        help='the number of attacks to simulate (default 10000)')
+    parser.add_argument('--engine', choices=['scalar', 'batch', 'exact'],
+                        default='scalar',
+                        help='simulate one attack at a time, all at once with NumPy, '
+                             'or calculate the exact distribution')
+    parser.add_argument('--seed', type=int, help='a seed for reproducible results')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='the number of processes to simulate with')
+    parser.add_argument('--json', action='store_true',
+                        help='print the summary as JSON')
+    parser.add_argument('--single', action='store_true',
+                        help='also print the log of a single attack')
+    parser.add_argument('--plot', action='store_true',
+                        help='show a plotly chart of the damage distribution')
+    return parser
+
+
+def get_player_params(args, player_type):
+    """Get the constructor parameters shared by both players from parsed arguments.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments.
+        player_type (str): Whether the player is an 'attacker' or 'defender'.
+
+    Returns:
+        dict: The constructor parameters by name.
+    """
+    def get(name):
+        return getattr(args, f'{player_type}_{name}')
+
+    dr_strange = get('dr_strange')
+    return {
+        'num_dice': get('dice'),
+        'num_rerolls': get('rerolls'),
+        'can_reroll_skulls': get('reroll_skulls'),
+        'dr_strange_reroll': (dr_strange is not None,
+                              dr_strange if dr_strange is not None else 0),
+        'is_hexed': get('hexed'),
+        'counts_blanks': get('counts_blanks'),
+        'counts_skulls': get('counts_skulls'),
+    }
+
+
+def summarise(sim, engine, num_sims, seed=None, workers=1):
+    """Simulate or calculate the attacks and summarise the results.
+
+    Args:
+        sim (Simulation): The simulation.
+        engine (str): 'scalar', 'batch' or 'exact'.
+        num_sims (int): The number of attacks to simulate (unused if exact).
+        seed (int, optional): A seed for reproducible results. Defaults to None.
+        workers (int, optional): The number of processes to simulate with.
+            Defaults to 1.
+
+    Returns:
+        dict: The summary statistics and the probability of each damage.
+    """
+    if engine == 'exact':
+        pmf, combo_probability = sim.calculate_exact()
+        damages = [damage for damage, probability in pmf.items() if probability > 0]
+        cumulative = 0.0
+        median = None
+        for damage, probability in pmf.items():
+            cumulative += probability
+            if median is None and cumulative >= 0.5:
+                median = damage
+        return {
+            'num_sims': None,
+            'mean': sum(damage * probability for damage, probability in pmf.items()),
+            'median': median,
+            'min': min(damages),
+            'max': max(damages),
+            'combo_rate': combo_probability,
+            'distribution': pmf,
+        }
+
+    results = sim.accumulate_results(num_sims, engine, seed=seed, workers=workers)
+    return {
+        'num_sims': results.total,
+        'mean': results.mean(),
+        'median': results.median(),
+        'min': results.min(),
+        'max': results.max(),
+        'combo_rate': results.combo_rate(),
+        'distribution': {damage: count / results.total for damage, count in
+                         results.histogram().items()},
+    }
+
+
+def main(argv=None):
+    """Run the command-line interface.
+
+    Args:
+        argv (list[str], optional): The arguments, or None to use sys.argv.
+            Defaults to None.
+
+    Returns:
+        int: The exit code.
+    """
+    args = build_parser().parse_args(argv)
+
+    attacker = Attacker(**get_player_params(args, 'attacker'),
+                        pierce_on_wild=args.attacker_pierce,
+                        combo=(args.attacker_combo, not args.attacker_keep_combo))
+    defender = Defender(**get_player_params(args, 'defender'),
+                        has_cover=args.defender_cover)
+    sim = Simulation(attacker, defender)
+    summary = summarise(sim, args.engine, args.sims, args.seed, args.workers)
+    summary_text = f'{attacker.get_text()}\n{defender.get_text()}'
+
+    if args.json:
+        import json
+        summary['attacker'] = attacker.get_config()
+        summary['defender'] = defender.get_config()
+        print(json.dumps(summary))
+    else:
+        print('-----ATTACKER AND DEFENDER INFO-----')
+        print(summary_text)
+        if summary['num_sims'] is None:
+            print('\n-----EXACT RESULTS-----')
+        else:
+            print(f'\n-----{summary["num_sims"]:,} ATTACKS-----')
+        print(f'Mean damage: {summary["mean"]}')
+        print(f'Median damage: {summary["median"]}')
+        print(f'Range of damage: {summary["min"]} to {summary["max"]}')
+        if len(attacker.combo) > 0:
+            print('Combo success rate: {0:.4g}%'.format(summary['combo_rate'] * 100))
+
+    if args.single:
+        dmg, log = sim.generate_single()
+        print('\n-----SINGLE ATTACK-----')
+        print(f'Output of single attack: {dmg}')
+        print(f'Log of single attack:\n{log}')
+
+    if args.plot:
+        # Plotly is slow to import, so it is only imported when a chart is requested
+        import plotly.express as px
+        distribution = summary['distribution']
+        fig = px.bar(x=list(distribution.keys()), y=list(distribution.values()),
+                     title=summary_text,
+                     labels={'x': 'Damage Dealt', 'y': 'Probability'})
+        fig.show()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -10,7 +10,8 @@ class Defender(Player):
 
     def __init__(self, num_dice, num_rerolls=0, can_reroll_skulls=False,
                  dr_strange_reroll=(False, 0), is_hexed=False, counts_blanks=False,
-                 counts_skulls=False, has_cover=False):
+                 counts_skulls=False, has_cover=False,
+                 use_face_counts=False, use_alias_tables=False, rng=None):
         """Take parent params plus defender-specific has_cover param.
 
         Args:
@@ -30,10 +31,20 @@ class Defender(Player):
                 Defaults to False.
             has_cover (bool, optional):Whether cover should be applied.
                 Defaults to False.
+            use_face_counts (bool, optional): Whether the dice pool is stored as a
+                face-count vector instead of a list, with dice rolled, rerolled and
+                counted as whole faces. Defaults to False.
+            use_alias_tables (bool, optional): Whether the initial roll and the
+                explosion of its crits are drawn at once from a precomputed alias
+                table over the face counts after the explosion, so explode_crits
+                does nothing. Defaults to False.
+            rng (random.Random, optional): The random number generator used to roll
+                dice. Defaults to None, which uses the global random module.
         """
         # Call parent constructor
         super().__init__(num_dice, num_rerolls, can_reroll_skulls,
-                         dr_strange_reroll, is_hexed, counts_blanks, counts_skulls)
+                         dr_strange_reroll, is_hexed, counts_blanks, counts_skulls,
+                         use_face_counts, use_alias_tables, rng)
 
         # Add the defender-specific param to the parent's status dictionary
         self.status['has_cover'] = has_cover
@@ -58,6 +69,16 @@ class Defender(Player):
         """
         return 'Defender' + super().get_text()
 
+    def get_config(self):
+        """Call parent function and add the defender-specific param.
+
+        Returns:
+            dict: The constructor parameters by name.
+        """
+        config = super().get_config()
+        config['has_cover'] = self.status['has_cover']
+        return config
+
     def decide_dr_strange_reroll(self, current_damage):
         """Calls parent function with defender flag.
 
@@ -69,6 +90,11 @@ class Defender(Player):
     def reroll(self):
         """Call parent function with a list of failure results that can be rerolled.
         """
+        # A face-count pool rerolls by face
+        if self.use_face_counts:
+            self._reroll_counts()
+            return
+
         # Get all rerollable failure results from the dice pool
         failures = [result for result in self.dice_pool
                     if result in self.rerollable_fails]
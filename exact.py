@@ -0,0 +1,570 @@
+from collections import defaultdict
+from functools import lru_cache
+
+from faces import FACES, FACE_INDEX, FACE_PROBABILITIES, to_counts
+
+# Face-count vector positions used by the exact engine
+CRIT, WILD, HIT, BLOCK, BLANK, SKULL = (FACE_INDEX[face] for face in FACES)
+
+
+@lru_cache(maxsize=None)
+def roll_distribution(num_dice):
+    """Get the exact distribution of face counts for a number of dice rolled at once.
+
+    Args:
+        num_dice (int): The number of dice rolled.
+
+    Returns:
+        dict: Each face-count vector (tuple[int]) mapped to its probability (float).
+    """
+    distribution = {(0,) * len(FACES): 1.0}
+    for _ in range(num_dice):
+        next_distribution = defaultdict(float)
+        for state, probability in distribution.items():
+            for face, face_probability in enumerate(FACE_PROBABILITIES):
+                next_state = list(state)
+                next_state[face] += 1
+                next_distribution[tuple(next_state)] += probability * face_probability
+        distribution = dict(next_distribution)
+    return distribution
+
+
+@lru_cache(maxsize=None)
+def exploded_distribution(num_dice, is_hexed):
+    """Get the exact distribution of face counts after the initial roll and, unless
+    hexed, the explosion of crits.
+
+    Args:
+        num_dice (int): The number of dice being rolled initially.
+        is_hexed (bool): Whether the hex condition is applied.
+
+    Returns:
+        dict: Each face-count vector (tuple[int]) mapped to its probability (float).
+    """
+    if is_hexed:
+        return roll_distribution(num_dice)
+    distribution = defaultdict(float)
+    for state, probability in roll_distribution(num_dice).items():
+        for extra, extra_probability in roll_distribution(state[CRIT]).items():
+            distribution[_add(state, extra)] += probability * extra_probability
+    return dict(distribution)
+
+
+def _add(state, other):
+    """Add two face-count vectors.
+
+    Args:
+        state (tuple[int]): A face-count vector.
+        other (tuple[int]): Another face-count vector.
+
+    Returns:
+        tuple[int]: The combined face-count vector.
+    """
+    return tuple(a + b for a, b in zip(state, other))
+
+
+def _change_first(state, old_faces, new_face):
+    """Change one die to a new face, taking the first old face present in order of
+    preference, as in Player._change_die.
+
+    Args:
+        state (tuple[int]): A face-count vector.
+        old_faces (list[int]): The faces to change in order of preference.
+        new_face (int): The face to change to.
+
+    Returns:
+        tuple[int]: The updated face-count vector.
+    """
+    for face in old_faces:
+        if state[face] > 0:
+            changed = list(state)
+            changed[face] -= 1
+            changed[new_face] += 1
+            return tuple(changed)
+    return state
+
+
+class _Side():
+    """The rules of a single player expressed on face-count vectors.
+    """
+
+    def __init__(self, player, player_type):
+        """Initialise the side.
+
+        Args:
+            player (Player): The Attacker or Defender object.
+            player_type (str): Whether the player is an 'attacker' or 'defender'.
+        """
+        self.player = player
+        self.player_type = player_type
+        self.success_faces = [FACE_INDEX[face] for face in player.success_results]
+        self.fail_faces = [FACE_INDEX[face] for face in player.rerollable_fails]
+        self.combo = to_counts(getattr(player, 'combo', []))
+        self.has_combo = sum(self.combo) > 0
+        # Whether an achieved combo is kept rather than rerolled
+        self.keeps_combo = self.has_combo and not getattr(player, 'rerolls_combos', True)
+        self._reroll_cache = {}
+        # Caches used by ExactEngine, kept here so engines sharing the side share them
+        self.outcome_cache = {}
+        self.key_outcome_cache = {}
+        self.final_cache = {}
+
+    def successes(self, state):
+        """Count the successes in a face-count vector.
+
+        Args:
+            state (tuple[int]): The player's face-count vector.
+
+        Returns:
+            int: The number of successful results.
+        """
+        return sum(state[face] for face in self.success_faces)
+
+    def check_combo(self, state):
+        """Check whether the combo has been achieved in a face-count vector.
+
+        Args:
+            state (tuple[int]): The player's face-count vector.
+
+        Returns:
+            bool: Whether the combo has been achieved.
+        """
+        return all(have >= need for have, need in zip(state, self.combo))
+
+    def decides_dr_strange_reroll(self, state, current_damage):
+        """Decide whether to completely reroll, as in Player.decide_dr_strange_reroll.
+
+        Args:
+            state (tuple[int]): The player's face-count vector.
+            current_damage (int): The current damage being inflicted/taken.
+
+        Returns:
+            bool: Whether the dice pool is completely rerolled.
+        """
+        player = self.player
+        if not player.status['dr_strange_reroll']:
+            return False
+        if not self.can_dr_strange_reroll(state):
+            return False
+        if player.dr_strange_reroll_threshold > -1:
+            if self.player_type == 'attacker':
+                return current_damage < player.dr_strange_reroll_threshold
+            return current_damage > player.dr_strange_reroll_threshold
+        return self.successes(state) / sum(state) < player.success_rate
+
+    def can_dr_strange_reroll(self, state):
+        """Check whether a complete reroll would be considered at all, i.e. an
+        achieved combo isn't being kept and not every die is already a success.
+
+        Args:
+            state (tuple[int]): The player's face-count vector.
+
+        Returns:
+            bool: Whether the reroll decision depends on the threshold or success rate.
+        """
+        if self.keeps_combo and self.check_combo(state):
+            return False
+        return self.successes(state) < sum(state)
+
+    def after_rerolls(self, state, complete_reroll):
+        """Get the distribution of face counts after any complete reroll and the
+        standard rerolls.
+
+        Args:
+            state (tuple[int]): The player's face-count vector.
+            complete_reroll (bool): Whether the dice pool is completely rerolled.
+
+        Returns:
+            dict: Each face-count vector mapped to its probability.
+        """
+        # A complete reroll only depends on the size of the dice pool
+        key = sum(state) if complete_reroll else state
+        if key not in self._reroll_cache:
+            if complete_reroll:
+                states = roll_distribution(sum(state))
+            else:
+                states = {state: 1.0}
+            distribution = defaultdict(float)
+            for rolled, probability in states.items():
+                for rerolled, reroll_probability in self._reroll(rolled).items():
+                    distribution[rerolled] += probability * reroll_probability
+            self._reroll_cache[key] = dict(distribution)
+        return self._reroll_cache[key]
+
+    def _reroll(self, state):
+        """Get the distribution of face counts after the standard rerolls, as in
+        Player.reroll.
+
+        Args:
+            state (tuple[int]): The player's face-count vector.
+
+        Returns:
+            dict: Each face-count vector mapped to its probability.
+        """
+        remaining = self.player.num_rerolls
+        if remaining <= 0:
+            return {state: 1.0}
+        protected = self.combo if self.keeps_combo and self.check_combo(state) else None
+        kept = list(state)
+        for face in self.fail_faces:
+            available = kept[face]
+            if protected is not None:
+                available = max(available - protected[face], 0)
+            taken = min(available, remaining)
+            kept[face] -= taken
+            remaining -= taken
+        kept = tuple(kept)
+        return {_add(kept, rerolled): probability for rerolled, probability in
+                roll_distribution(self.player.num_rerolls - remaining).items()}
+
+
+class ExactEngine():
+    """An engine that calculates the exact distribution of attack results by
+    following the probability of every reachable face-count state of the dice pools
+    through each phase of Simulation._resolve_attack.
+    """
+
+    def __init__(self, attacker, defender, sides=None):
+        """Initialise the engine.
+
+        Args:
+            attacker (Attacker): The Attacker object.
+            defender (Defender): The Defender object.
+            sides (dict, optional): Player configurations shared between engines, so
+                work done for one player is reused in every matchup it appears in.
+                Defaults to None.
+        """
+        self.attacker = attacker
+        self.defender = defender
+        if sides is None:
+            sides = {}
+        self._attack_side = self._get_side(sides, attacker, 'attacker')
+        self._defence_side = self._get_side(sides, defender, 'defender')
+        self._distribution = None
+
+    def get_distribution(self):
+        """Get the exact joint distribution of damage and combo results.
+
+        Returns:
+            dict: Each (damage (int), combo achieved (bool)) result mapped to its
+                probability (float).
+        """
+        if self._distribution is None:
+            self._distribution = self._calculate_distribution()
+        return self._distribution
+
+    def get_threshold_distributions(self, thresholds):
+        """Get the exact joint distribution of damage and combo results for each of a
+        number of attacker Dr Strange reroll thresholds. The attacker's states are
+        only followed once: for each defender key, the difference a complete reroll
+        makes is grouped by the current damage, so each threshold just adds up the
+        groups below it.
+
+        Args:
+            thresholds (list[int]): The damage thresholds, where the attacker
+                completely rerolls while the current damage is below the threshold.
+
+        Returns:
+            dict: Each threshold mapped to a dict of each (damage (int), combo
+                achieved (bool)) result mapped to its probability (float).
+        """
+        attack_side = self._attack_side
+        defence_side = self._defence_side
+        attacker = self.attacker
+        defender = self.defender
+
+        attack_states = exploded_distribution(attacker.num_dice,
+                                              attacker.status['is_hexed'])
+        defence_states = exploded_distribution(defender.num_dice,
+                                               defender.status['is_hexed'])
+
+        def defence_key(state):
+            return (defence_side.successes(state), self._cover_applicable(state))
+
+        # For each defender key, the attacker's outcomes without a complete reroll,
+        # and the change to them from a complete reroll at each current damage
+        kept_outcomes = {}
+        reroll_changes = {}
+        for defence_state in defence_states:
+            key = defence_key(defence_state)
+            if key in kept_outcomes:
+                continue
+            kept = defaultdict(float)
+            changes = defaultdict(lambda: defaultdict(float))
+            for attack_state, probability in attack_states.items():
+                kept_state = self._attack_outcomes(attack_state, False)
+                for outcome, final_probability in kept_state.items():
+                    kept[outcome] += probability * final_probability
+                if not attack_side.can_dr_strange_reroll(attack_state):
+                    continue
+                current_damage = self._calculate_current_damage(
+                    attack_side.successes(attack_state), attack_state[WILD] > 0,
+                    key[0], key[1])
+                change = changes[current_damage]
+                for outcome, final_probability in kept_state.items():
+                    change[outcome] -= probability * final_probability
+                for outcome, final_probability in self._attack_outcomes(
+                        attack_state, True).items():
+                    change[outcome] += probability * final_probability
+            kept_outcomes[key] = kept
+            reroll_changes[key] = changes
+
+        distributions = {}
+        for threshold in thresholds:
+            attack_outcomes = {}
+            for key, kept in kept_outcomes.items():
+                outcomes = defaultdict(float, kept)
+                for current_damage, change in reroll_changes[key].items():
+                    if current_damage < threshold:
+                        for outcome, probability in change.items():
+                            outcomes[outcome] += probability
+                attack_outcomes[key] = outcomes
+            distributions[threshold] = self._combine(defence_states, attack_outcomes,
+                                                     defence_key)
+        return distributions
+
+    def _get_side(self, sides, player, player_type):
+        """Get the shared side for a player's configuration, creating it if needed.
+
+        Args:
+            sides (dict): The shared sides by configuration key.
+            player (Player): The Attacker or Defender object.
+            player_type (str): Whether the player is an 'attacker' or 'defender'.
+
+        Returns:
+            _Side: The side for the player's configuration.
+        """
+        key = player.get_config_key()
+        if key not in sides:
+            sides[key] = _Side(player, player_type)
+        return sides[key]
+
+    def get_damage_pmf(self):
+        """Get the exact probability of each amount of damage.
+
+        Returns:
+            dict: Each damage output (int) mapped to its probability (float), in
+                ascending order of damage.
+        """
+        pmf = defaultdict(float)
+        for (damage, _), probability in self.get_distribution().items():
+            pmf[damage] += probability
+        return dict(sorted(pmf.items()))
+
+    def get_combo_probability(self):
+        """Get the exact probability of achieving the combo.
+
+        Returns:
+            float: The probability of the combo being achieved.
+        """
+        return sum(probability for (_, combo), probability in
+                   self.get_distribution().items() if combo)
+
+    def get_attack_outcomes(self):
+        """Get the exact distribution of the attacker's final outcome on its own, which
+        doesn't depend on the defender unless the attacker has a Dr Strange reroll.
+
+        Raises:
+            ValueError: If the attacker has a Dr Strange reroll.
+
+        Returns:
+            dict: Each (successes (int), has wild (bool), combo achieved (bool))
+                outcome mapped to its probability (float).
+        """
+        if self.attacker.status['dr_strange_reroll']:
+            raise ValueError("A Dr Strange reroll depends on the defender's dice")
+        outcomes = defaultdict(float)
+        for state, probability in exploded_distribution(
+                self.attacker.num_dice, self.attacker.status['is_hexed']).items():
+            for outcome, final_probability in self._attack_outcomes(state,
+                                                                    False).items():
+                outcomes[outcome] += probability * final_probability
+        return dict(outcomes)
+
+    def get_defence_outcomes(self, pierced):
+        """Get the exact distribution of the defender's final successes on their own,
+        which only depend on the attacker through pierce unless the defender has a Dr
+        Strange reroll.
+
+        Args:
+            pierced (bool): Whether pierce is applied.
+
+        Raises:
+            ValueError: If the defender has a Dr Strange reroll.
+
+        Returns:
+            dict: Each number of successes (int) mapped to its probability (float).
+        """
+        if self.defender.status['dr_strange_reroll']:
+            raise ValueError("A Dr Strange reroll depends on the attacker's dice")
+        distribution = defaultdict(float)
+        for state, probability in exploded_distribution(
+                self.defender.num_dice, self.defender.status['is_hexed']).items():
+            for successes, final_probability in self._final_defence(
+                    state, False, pierced).items():
+                distribution[successes] += probability * final_probability
+        return dict(distribution)
+
+    def _calculate_current_damage(self, attack_successes, attack_wild,
+                                  defence_successes, cover_applicable):
+        """Calculate the current damage, as in Simulation._calculate_current_damage.
+
+        Args:
+            attack_successes (int): The attacker's successes.
+            attack_wild (bool): Whether the attacker has a wild.
+            defence_successes (int): The defender's successes.
+            cover_applicable (bool): Whether cover will change one of the
+                defender's dice.
+
+        Returns:
+            int: The current damage (minimum of 0).
+        """
+        current_damage = max(attack_successes - defence_successes, 0)
+        if cover_applicable:
+            current_damage -= 1
+        if (self.attacker.status['pierce_on_wild'] and attack_wild and
+                (defence_successes > 0 or cover_applicable)):
+            current_damage += 1
+        return max(current_damage, 0)
+
+    def _cover_applicable(self, state):
+        """Check whether cover will change one of the defender's dice.
+
+        Args:
+            state (tuple[int]): The defender's face-count vector.
+
+        Returns:
+            bool: Whether the defender has cover and a hit or blank to change.
+        """
+        return self.defender.status['has_cover'] and (state[HIT] > 0 or
+                                                      state[BLANK] > 0)
+
+    def _calculate_distribution(self):
+        """Calculate the exact joint distribution of damage and combo results.
+
+        Returns:
+            dict: Each (damage, combo achieved) result mapped to its probability.
+        """
+        attack_side = self._attack_side
+        defence_side = self._defence_side
+        attacker = self.attacker
+        defender = self.defender
+
+        attack_states = exploded_distribution(attacker.num_dice,
+                                              attacker.status['is_hexed'])
+        defence_states = exploded_distribution(defender.num_dice,
+                                               defender.status['is_hexed'])
+
+        # The attacker only looks at the defender's dice when deciding on a Dr Strange
+        # reroll, and then only at their successes and whether cover will apply
+        def defence_key(state):
+            if not attacker.status['dr_strange_reroll']:
+                return None
+            return (defence_side.successes(state), self._cover_applicable(state))
+
+        # Distribution of the attacker's final (successes, has wild, combo) for each
+        # defender key, which only depends on the attacker
+        attack_outcomes = attack_side.key_outcome_cache
+        for defence_state in defence_states:
+            key = defence_key(defence_state)
+            if key in attack_outcomes:
+                continue
+            outcomes = defaultdict(float)
+            for attack_state, probability in attack_states.items():
+                complete_reroll = False
+                if key is not None:
+                    current_damage = self._calculate_current_damage(
+                        attack_side.successes(attack_state), attack_state[WILD] > 0,
+                        key[0], key[1])
+                    complete_reroll = attack_side.decides_dr_strange_reroll(
+                        attack_state, current_damage)
+                for outcome, final_probability in self._attack_outcomes(
+                        attack_state, complete_reroll).items():
+                    outcomes[outcome] += probability * final_probability
+            attack_outcomes[key] = outcomes
+        return self._combine(defence_states, attack_outcomes, defence_key)
+
+    def _combine(self, defence_states, attack_outcomes, defence_key):
+        """Follow each defender state through their rerolls, cover and pierce against
+        each attacker outcome.
+
+        Args:
+            defence_states (dict): Each defender face-count vector after crits mapped
+                to its probability.
+            attack_outcomes (dict): Each defender key mapped to the distribution of
+                the attacker's final (successes, has wild, combo) outcome.
+            defence_key (function): Gets the defender key of a face-count vector.
+
+        Returns:
+            dict: Each (damage, combo achieved) result mapped to its probability.
+        """
+        defence_side = self._defence_side
+        attacker = self.attacker
+        distribution = defaultdict(float)
+        for defence_state, defence_probability in defence_states.items():
+            cover_applicable = self._cover_applicable(defence_state)
+            defence_successes = defence_side.successes(defence_state)
+            for outcome, attack_probability in attack_outcomes[
+                    defence_key(defence_state)].items():
+                attack_successes, attack_wild, combo = outcome
+                current_damage = self._calculate_current_damage(
+                    attack_successes, attack_wild, defence_successes, cover_applicable)
+                complete_reroll = defence_side.decides_dr_strange_reroll(
+                    defence_state, current_damage)
+                pierced = attacker.status['pierce_on_wild'] and attack_wild
+                weight = defence_probability * attack_probability
+                for final_successes, probability in self._final_defence(
+                        defence_state, complete_reroll, pierced).items():
+                    damage = max(attack_successes - final_successes, 0)
+                    distribution[(damage, combo)] += weight * probability
+        return dict(distribution)
+
+    def _attack_outcomes(self, state, complete_reroll):
+        """Get the distribution of the attacker's final outcome after rerolls.
+
+        Args:
+            state (tuple[int]): The attacker's face-count vector after crits.
+            complete_reroll (bool): Whether the dice pool is completely rerolled.
+
+        Returns:
+            dict: Each (successes (int), has wild (bool), combo achieved (bool))
+                outcome mapped to its probability (float).
+        """
+        attack_side = self._attack_side
+        key = sum(state) if complete_reroll else state
+        if key not in attack_side.outcome_cache:
+            outcomes = defaultdict(float)
+            for final_state, probability in attack_side.after_rerolls(
+                    state, complete_reroll).items():
+                outcome = (attack_side.successes(final_state), final_state[WILD] > 0,
+                           attack_side.has_combo and
+                           attack_side.check_combo(final_state))
+                outcomes[outcome] += probability
+            attack_side.outcome_cache[key] = dict(outcomes)
+        return attack_side.outcome_cache[key]
+
+    def _final_defence(self, state, complete_reroll, pierced):
+        """Get the distribution of the defender's final successes after rerolls, cover
+        and pierce.
+
+        Args:
+            state (tuple[int]): The defender's face-count vector after crits.
+            complete_reroll (bool): Whether the dice pool is completely rerolled.
+            pierced (bool): Whether pierce is applied.
+
+        Returns:
+            dict: Each number of successes (int) mapped to its probability (float).
+        """
+        defence_side = self._defence_side
+        key = (state, complete_reroll, pierced)
+        if key not in defence_side.final_cache:
+            distribution = defaultdict(float)
+            for rerolled, probability in defence_side.after_rerolls(
+                    state, complete_reroll).items():
+                if self.defender.status['has_cover']:
+                    rerolled = _change_first(rerolled, [HIT, BLANK], BLOCK)
+                if pierced:
+                    rerolled = _change_first(rerolled, [CRIT, WILD, BLOCK], BLANK)
+                distribution[defence_side.successes(rerolled)] += probability
+            defence_side.final_cache[key] = dict(distribution)
+        return defence_side.final_cache[key]
@@ -1,5 +1,3 @@
-from statistics import mean, median
-from collections import Counter
 import plotly.express as px
 
 from simulation import Simulation
@@ -35,20 +33,18 @@ print(summary_text)
 
 # Simulation of multiple attacks
 print('\n-----10,000 ATTACKS-----')
-# Generate the results as a list of tuples
-results = sim.generate_results(10000)
-# Split the list of tuples in to two separate lists
-damage, combo_hits = zip(*results)
+# Count the results into an accumulator as they are generated
+results = sim.accumulate_results(10000)
 # Calculate and print the average damage dealt
-print(f'Mean damage: {mean(damage)}')
-print(f'Median damage: {median(damage)}')
-print(f'Range of damage: {min(damage)} to {max(damage)}')
+print(f'Mean damage: {results.mean()}')
+print(f'Median damage: {results.median()}')
+print(f'Range of damage: {results.min()} to {results.max()}')
 # If a combo was provided, calculate and print the success rate
 if len(attacker.combo) > 0:
-    percentage = (sum(combo_hits) / len(combo_hits)) * 100
+    percentage = results.combo_rate() * 100
     print('Combo success rate: {0:.4g}%'.format(percentage))
 # Generate a graph of damage dealt
-count = Counter(list(damage))
+count = results.histogram()
 x_values = count.keys()
 y_values = count.values()
 fig = px.bar(x=x_values, y=y_values, title=summary_text,
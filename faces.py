@@ -0,0 +1,149 @@
+from operator import add, mul
+
+# A list of the 8 sides of the die
+RESULTS = ['crit', 'wild', 'hit', 'hit', 'block', 'blank', 'blank', 'skull']
+
+# The distinct results on the die, in the fixed order used for face-count vectors
+FACES = ('crit', 'wild', 'hit', 'block', 'blank', 'skull')
+# The position of each distinct result in a face-count vector
+FACE_INDEX = {face: index for index, face in enumerate(FACES)}
+# The face index of each of the 8 sides of the die
+SIDE_FACES = tuple(FACE_INDEX[result] for result in RESULTS)
+# The probability of rolling each distinct result on a single die
+FACE_PROBABILITIES = tuple(SIDE_FACES.count(index) / len(SIDE_FACES)
+                           for index in range(len(FACES)))
+# A face-count vector with no dice
+NO_COUNTS = (0,) * len(FACES)
+
+
+def to_counts(results):
+    """Convert a list of die results to a face-count vector.
+
+    Args:
+        results (list[str]): The die results, e.g. a dice pool or a combo.
+
+    Raises:
+        ValueError: If a result is not a face of the die.
+
+    Returns:
+        tuple[int]: The number of each face in FACES order.
+    """
+    counts = [0] * len(FACES)
+    for result in results:
+        if result not in FACE_INDEX:
+            raise ValueError(f'Unknown die result: {result!r}')
+        counts[FACE_INDEX[result]] += 1
+    return tuple(counts)
+
+
+def from_counts(counts):
+    """Convert a face-count vector back to a list of die results.
+
+    Args:
+        counts (tuple[int]): The number of each face in FACES order.
+
+    Returns:
+        list[str]: The die results, grouped by face.
+    """
+    return [face for face, count in zip(FACES, counts) for _ in range(count)]
+
+
+class FaceCountPool():
+    """A dice pool stored as a fixed-size face-count vector rather than a list of
+    results, so dice are rolled, rerolled and counted as whole faces at a time. It
+    supports the list operations used on a dice pool and is shown as a list of
+    results.
+    """
+
+    def __init__(self, counts, success_mask):
+        """Initialise the pool.
+
+        Args:
+            counts (list[int]): The number of each face in FACES order.
+            success_mask (tuple[bool]): Whether each face in FACES order is classed
+                as a success.
+        """
+        self.counts = list(counts)
+        self._success_mask = success_mask
+
+    @property
+    def successes(self):
+        """int: The number of dice in the pool classed as successes."""
+        return sum(map(mul, self.counts, self._success_mask))
+
+    def __len__(self):
+        return sum(self.counts)
+
+    def __contains__(self, result):
+        index = FACE_INDEX.get(result)
+        return index is not None and self.counts[index] > 0
+
+    def __iter__(self):
+        return iter(from_counts(self.counts))
+
+    def __repr__(self):
+        return repr(from_counts(self.counts))
+
+    def count(self, result):
+        """Get the number of a result in the pool.
+
+        Args:
+            result (str): The die result.
+
+        Returns:
+            int: The number of dice showing the result.
+        """
+        index = FACE_INDEX.get(result)
+        return 0 if index is None else self.counts[index]
+
+    def add_counts(self, counts):
+        """Add the dice of a face-count vector to the pool.
+
+        Args:
+            counts (list[int]): The number of each face in FACES order.
+        """
+        self.counts = list(map(add, self.counts, counts))
+
+    def append(self, result):
+        """Add a die result to the pool.
+
+        Args:
+            result (str): The die result.
+        """
+        self.counts[FACE_INDEX[result]] += 1
+
+    def extend(self, results):
+        """Add several die results to the pool.
+
+        Args:
+            results (list[str]): The die results.
+        """
+        counts = self.counts
+        for result in results:
+            counts[FACE_INDEX[result]] += 1
+
+    def remove(self, result):
+        """Remove a die result from the pool.
+
+        Args:
+            result (str): The die result.
+
+        Raises:
+            ValueError: If the result is not in the pool.
+        """
+        index = FACE_INDEX.get(result)
+        if index is None or self.counts[index] == 0:
+            raise ValueError(f'{result!r} is not in the dice pool')
+        self.counts[index] -= 1
+
+    def replace(self, old_value, new_value):
+        """Replace one instance of a result with another, if it is in the pool.
+
+        Args:
+            old_value (str): The die result being replaced.
+            new_value (str): The new die result.
+        """
+        old_index = FACE_INDEX[old_value]
+        if self.counts[old_index] > 0:
+            self.counts[old_index] -= 1
+            self.counts[FACE_INDEX[new_value]] += 1
@@ -0,0 +1,102 @@
+from pipeline import STEPS, side_steps
+from simulation import Simulation
+from stats import ResultAccumulator
+
+
+class MultiTargetSimulation():
+    """A class for the simulation of area and beam attacks, where one attack roll by
+    an attacker is used against several defenders. The attacker's roll, crits and
+    rerolls are resolved once per attack, and each defender then rolls and applies
+    its own rerolls, cover and pierce against that same roll, so the damage to each
+    target is correlated as in the game.
+    """
+
+    def __init__(self, attacker, defenders, steps=None):
+        """Initialise the simulation.
+
+        Args:
+            attacker (Attacker): The Attacker object.
+            defenders (list[Defender]): The Defender objects. The first is the primary
+                target, whose dice the attacker looks at when deciding on a Dr
+                Strange reroll.
+            steps (tuple[Step], optional): The steps of the attack, e.g. from
+                pipeline.insert_step with a new ability. Every step is run against
+                the primary target, and the steps with side 'defender' are also run
+                against each other target. Defaults to None, which uses
+                pipeline.STEPS.
+
+        Raises:
+            ValueError: If no defenders are given.
+        """
+        self.attacker = attacker
+        self.defenders = list(defenders)
+        if not self.defenders:
+            raise ValueError('At least one defender is required')
+        self.steps = steps
+        # The primary target resolves the whole attack, and the other targets only
+        # resolve the defender's side against the attacker's final dice
+        defender_steps = side_steps(STEPS if steps is None else steps, 'defender')
+        self.simulations = ([Simulation(attacker, self.defenders[0], steps)] +
+                            [Simulation(attacker, defender, defender_steps)
+                             for defender in self.defenders[1:]])
+
+    def generate_results(self, num_sims):
+        """Generate a list of tuples with the damage to each defender and whether the
+        combo was achieved for attacks, simulated a number of times.
+
+        Args:
+            num_sims (int): The number of times to simulate the attack.
+
+        Returns:
+            list[tuple]: A list of tuples with the damage dealt to each defender
+                (tuple[int]) and whether the combo was achieved (bool).
+        """
+        return [self._resolve_attack() for _ in range(num_sims)]
+
+    def accumulate_results(self, num_sims):
+        """Simulate attacks a number of times and count the results for each defender
+        into its own accumulator as they are generated.
+
+        Args:
+            num_sims (int): The number of times to simulate the attack.
+
+        Returns:
+            list[ResultAccumulator]: The accumulator for each defender.
+        """
+        accumulators = [ResultAccumulator() for _ in self.defenders]
+        for _ in range(num_sims):
+            damages, combo = self._resolve_attack()
+            for accumulator, damage in zip(accumulators, damages):
+                accumulator.add(damage, combo)
+        return accumulators
+
+    def generate_joint_distribution(self, num_sims):
+        """Generate the joint distribution of the damage to every defender for attacks,
+        simulated a number of times.
+
+        Args:
+            num_sims (int): The number of times to simulate the attack.
+
+        Returns:
+            dict: Each tuple of the damage dealt to each defender (tuple[int]) mapped
+                to the number of attacks with that result.
+        """
+        distribution = {}
+        for _ in range(num_sims):
+            damages, _ = self._resolve_attack()
+            distribution[damages] = distribution.get(damages, 0) + 1
+        return distribution
+
+    def _resolve_attack(self):
+        """Resolve one attack against every defender.
+
+        Returns:
+            tuple: The damage dealt to each defender (tuple[int]) and whether the
+                combo was achieved (bool).
+        """
+        primary = self.simulations[0]
+        damage, combo = primary._resolve_attack()
+        damages = [damage]
+        for simulation in self.simulations[1:]:
+            damages.append(simulation._resolve_attack()[0])
+        return tuple(damages), combo
@@ -0,0 +1,104 @@
+import copy
+import random
+
+from stats import ResultAccumulator
+
+# The number of attacks in each independently seeded chunk. Results for a seed depend
+# on this, but not on the number of workers.
+CHUNK_SIZE = 10000
+
+
+def run_seeded(attacker, defender, num_sims, seed, workers=1, engine='scalar',
+               accumulate=False, steps=None):
+    """Simulate attacks in fixed-size chunks, each with its own random streams seeded
+    from the master seed and the chunk number, spread across a pool of processes.
+    The chunks are merged in order, so the results for a seed are identical however
+    many workers are used.
+
+    Args:
+        attacker (Attacker): The Attacker object.
+        defender (Defender): The Defender object.
+        num_sims (int): The number of times to simulate the attack.
+        seed (int): The master seed.
+        workers (int, optional): The number of processes to use. Defaults to 1, which
+            runs in the current process.
+        engine (str, optional): 'scalar' or 'batch'. Defaults to 'scalar'.
+        accumulate (bool, optional): Whether to return a ResultAccumulator rather than
+            a list of results. Defaults to False.
+        steps (tuple[Step], optional): The steps of the attack, which must be
+            picklable to use more than one worker. Defaults to None, which uses
+            pipeline.STEPS.
+
+    Returns:
+        list[tuple] or ResultAccumulator: The results of every attack in order, or
+            the accumulator holding them.
+    """
+    tasks = [(attacker, defender, engine, seed, index,
+              min(CHUNK_SIZE, num_sims - start), accumulate, steps)
+             for index, start in enumerate(range(0, num_sims, CHUNK_SIZE))]
+    if workers > 1:
+        # Only import the process pool machinery when it is used
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunks = list(executor.map(_run_chunk, tasks))
+    else:
+        chunks = [_run_chunk(task) for task in tasks]
+
+    if accumulate:
+        accumulator = ResultAccumulator()
+        for damage_counts, combo_counts in chunks:
+            accumulator.add_counts(damage_counts, combo_counts)
+        return accumulator
+    return [result for chunk in chunks for result in chunk]
+
+
+def chunk_rng(seed, index, side):
+    """Create the random number generator for one side of one chunk.
+
+    Args:
+        seed (int): The master seed.
+        index (int): The chunk number.
+        side (str): 'attacker' or 'defender'.
+
+    Returns:
+        random.Random: The seeded generator.
+    """
+    # String seeds are hashed with SHA-512, so they don't depend on PYTHONHASHSEED
+    return random.Random(f'{seed}:{index}:{side}')
+
+
+def _run_chunk(task):
+    """Simulate one chunk of attacks with its own seeded random streams.
+
+    Args:
+        task (tuple): The attacker, defender, engine, master seed, chunk number,
+            number of attacks, whether to accumulate the results and the steps.
+
+    Returns:
+        list[tuple] or tuple[list]: The results of the attacks, or the damage and
+            combo counts if accumulating.
+    """
+    from simulation import Simulation
+
+    attacker, defender, engine, seed, index, num_sims, accumulate, steps = task
+    # Copy the players so the caller's random number generators are left alone
+    attacker = copy.copy(attacker)
+    defender = copy.copy(defender)
+    attacker.rng = chunk_rng(seed, index, 'attacker')
+    defender.rng = chunk_rng(seed, index, 'defender')
+    simulation = Simulation(attacker, defender, steps)
+
+    if engine == 'batch':
+        from batch import BatchEngine
+        batch_engine = BatchEngine(attacker, defender, seed=[seed, index], steps=steps)
+        if accumulate:
+            accumulator = ResultAccumulator()
+            batch_engine.accumulate(num_sims, accumulator)
+            return accumulator.damage_counts, accumulator.combo_counts
+        damage, combos = batch_engine.run(num_sims)
+        return list(zip(damage.tolist(), combos.tolist()))
+
+    if accumulate:
+        accumulator = simulation.accumulate_results(num_sims, engine)
+        return accumulator.damage_counts, accumulator.combo_counts
+    return simulation.generate_results(num_sims, engine)
@@ -0,0 +1,284 @@
+from functools import partial
+
+
+class Step():
+    """One phase of an attack, declared once for every engine. A step is only
+    compiled into a simulation when it applies to the attacker and defender, so
+    phases for rules which aren't in use cost nothing per attack.
+    """
+
+    def __init__(self, name, scalar, batch=None, applies=None, modes=(),
+                 skip_modes=(), side=None):
+        """Initialise the step.
+
+        Args:
+            name (str): The name of the step, used to insert other steps around it.
+            scalar (function): Takes a Simulation and returns a function with no
+                arguments which resolves the step for one attack.
+            batch (function, optional): Takes a BatchEngine and returns a function
+                which resolves the step for a chunk of attacks, given the chunk's
+                state dict. Defaults to None, for steps the batch engine can't run.
+            applies (function, optional): Takes the Attacker and Defender objects and
+                returns whether the step is needed. Defaults to None, which always
+                applies.
+            modes (tuple[str], optional): Modes the step is only used in, e.g.
+                'traced'. Defaults to ().
+            skip_modes (tuple[str], optional): Modes the step isn't used in, e.g.
+                'stratified'. Defaults to ().
+            side (str, optional): 'attacker' if the step only changes the attacker's
+                dice or result, or 'defender' if it changes a single defender's dice.
+                Defaults to None, e.g. for tracing.
+        """
+        self.name = name
+        self.scalar = scalar
+        self.batch = batch
+        self.applies = applies
+        self.modes = frozenset(modes)
+        self.skip_modes = frozenset(skip_modes)
+        self.side = side
+
+    def is_active(self, attacker, defender, modes):
+        """Check whether the step is needed for some players in some modes.
+
+        Args:
+            attacker (Attacker): The Attacker object.
+            defender (Defender): The Defender object.
+            modes (frozenset[str]): The active modes.
+
+        Returns:
+            bool: Whether the step is needed.
+        """
+        if not self.modes <= modes or self.skip_modes & modes:
+            return False
+        return self.applies is None or self.applies(attacker, defender)
+
+
+def compile_scalar(steps, simulation, modes=frozenset()):
+    """Compile the steps which are needed for a simulation into functions.
+
+    Args:
+        steps (tuple[Step]): The declared steps, in order.
+        simulation (Simulation): The simulation resolving the attacks.
+        modes (frozenset[str], optional): The active modes, from 'traced' and
+            'stratified'. Defaults to none.
+
+    Returns:
+        list[function]: The function with no arguments for each needed step.
+    """
+    return [step.scalar(simulation) for step in steps
+            if step.is_active(simulation.attacker, simulation.defender, modes)]
+
+
+def compile_batch(steps, engine):
+    """Compile the steps which are needed for a batch engine into functions.
+
+    Args:
+        steps (tuple[Step]): The declared steps, in order.
+        engine (BatchEngine): The engine resolving the attacks.
+
+    Raises:
+        ValueError: If a needed step has no batch implementation.
+
+    Returns:
+        list[function]: The function taking a chunk's state dict for each needed
+            step.
+    """
+    compiled = []
+    for step in steps:
+        if not step.is_active(engine.attacker, engine.defender, frozenset()):
+            continue
+        if step.batch is None:
+            raise ValueError(f'Step {step.name!r} has no batch implementation')
+        compiled.append(step.batch(engine))
+    return compiled
+
+
+def insert_step(steps, step, before=None):
+    """Add a step to a pipeline, e.g. a new ability of the defender modifying the
+    attacker's dice.
+
+    Args:
+        steps (tuple[Step]): The declared steps, in order.
+        step (Step): The new step.
+        before (str, optional): The name of the step to insert it before.
+            Defaults to None, which adds it at the end.
+
+    Raises:
+        ValueError: If there is no step with the name.
+
+    Returns:
+        tuple[Step]: The steps including the new step.
+    """
+    if before is None:
+        return tuple(steps) + (step,)
+    for index, existing in enumerate(steps):
+        if existing.name == before:
+            return tuple(steps[:index]) + (step,) + tuple(steps[index:])
+    raise ValueError(f'Unknown step: {before!r}')
+
+
+def side_steps(steps, side):
+    """Get the steps for one side of the attack, e.g. to resolve the defender's side
+    against an attacker whose dice have already been resolved.
+
+    Args:
+        steps (tuple[Step]): The declared steps, in order.
+        side (str): 'attacker' or 'defender'.
+
+    Returns:
+        tuple[Step]: The steps for the side, in order.
+    """
+    return tuple(step for step in steps if step.side == side)
+
+
+# ------------------------------
+# Scalar step implementations
+# ------------------------------
+
+def _conditioned_roll(simulation):
+    """Bind the attacker's initial roll conditioned on the stratum being sampled."""
+    attacker = simulation.attacker
+    return lambda: attacker.conditioned_roll(*simulation.attacker_stratum[:2])
+
+
+def _conditioned_explode(simulation):
+    """Bind the attacker's crit explosion conditioned on the stratum being sampled."""
+    attacker = simulation.attacker
+    return lambda: attacker.conditioned_explode(*simulation.attacker_stratum[2:])
+
+
+def _dr_strange_reroll(player_name):
+    """Create the binder for a player's Dr Strange reroll decision, which needs the
+    current damage."""
+    def bind(simulation):
+        decide = getattr(simulation, player_name).decide_dr_strange_reroll
+        current_damage = simulation._calculate_current_damage
+        return lambda: decide(current_damage())
+    return bind
+
+
+def _pierce(simulation):
+    """Bind pierce, which is only applied if the attacker rolled a wild."""
+    attacker = simulation.attacker
+    apply_pierce = simulation.defender.apply_pierce
+
+    def pierce():
+        if 'wild' in attacker.dice_pool:
+            apply_pierce()
+    return pierce
+
+
+def _combo_check(simulation):
+    """Bind the check of the attacker's combo, storing it as the attack's result."""
+    check_combo = simulation.attacker.check_combo
+
+    def combo_check():
+        simulation.combo_result = check_combo()
+    return combo_check
+
+
+def _trace(phase):
+    """Create the binder for recording the dice pools after a phase."""
+    return lambda simulation: partial(simulation._print_status, phase)
+
+
+def _trace_crits(simulation):
+    """Bind recording the dice pools and current damage after crits explode."""
+    def trace_crits():
+        simulation._print_status('crits exploded')
+        simulation.trace.record_current_damage(simulation._calculate_current_damage())
+    return trace_crits
+
+
+def _trace_pierce(simulation):
+    """Bind recording the dice pools if pierce was applied."""
+    def trace_pierce():
+        if 'wild' in simulation.attacker.dice_pool:
+            simulation._print_status('pierce applied')
+    return trace_pierce
+
+
+def _trace_result(simulation):
+    """Bind recording the result of the attack."""
+    has_combo = len(simulation.attacker.combo) > 0
+
+    def trace_result():
+        simulation.trace.record_result(simulation._calculate_damage(),
+                                       simulation.combo_result, has_combo)
+    return trace_result
+
+
+# The phases of an attack, in the order they are resolved
+STEPS = (
+    # ------Roll initial dice pools------
+    Step('attacker initial roll', lambda sim: sim.attacker.initial_roll,
+         lambda engine: engine._roll_attacker, skip_modes=('stratified',),
+         side='attacker'),
+    Step('attacker conditioned roll', _conditioned_roll, modes=('stratified',),
+         side='attacker'),
+    Step('defender initial roll', lambda sim: sim.defender.initial_roll,
+         lambda engine: engine._roll_defender, side='defender'),
+    Step('trace initial roll', _trace('initial roll'), modes=('traced',)),
+
+    # ------Resolve crits------
+    Step('attacker crits', lambda sim: sim.attacker.explode_crits,
+         lambda engine: engine._explode_attacker_crits,
+         applies=lambda attacker, defender: not attacker.status['is_hexed'],
+         skip_modes=('stratified',), side='attacker'),
+    Step('attacker conditioned crits', _conditioned_explode,
+         applies=lambda attacker, defender: not attacker.status['is_hexed'],
+         modes=('stratified',), side='attacker'),
+    Step('defender crits', lambda sim: sim.defender.explode_crits,
+         lambda engine: engine._explode_defender_crits,
+         applies=lambda attacker, defender: not defender.status['is_hexed'],
+         side='defender'),
+    Step('trace crits exploded', _trace_crits, modes=('traced',)),
+
+    # ------Attacker modifies own dice------
+    Step('attacker dr strange reroll', _dr_strange_reroll('attacker'),
+         lambda engine: engine._attacker_dr_strange_reroll,
+         applies=lambda attacker, defender: attacker.status['dr_strange_reroll'],
+         side='attacker'),
+    Step('attacker reroll', lambda sim: sim.attacker.reroll,
+         lambda engine: engine._attacker_reroll,
+         applies=lambda attacker, defender: attacker.num_rerolls > 0,
+         side='attacker'),
+
+    # ------Defender modifies own dice------
+    Step('defender dr strange reroll', _dr_strange_reroll('defender'),
+         lambda engine: engine._defender_dr_strange_reroll,
+         applies=lambda attacker, defender: defender.status['dr_strange_reroll'],
+         side='defender'),
+    Step('defender reroll', lambda sim: sim.defender.reroll,
+         lambda engine: engine._defender_reroll,
+         applies=lambda attacker, defender: defender.num_rerolls > 0,
+         side='defender'),
+    Step('trace rerolls', _trace('rerolls'), modes=('traced',)),
+
+    # Apply cover
+    Step('cover', lambda sim: sim.defender.apply_cover,
+         lambda engine: engine._apply_cover,
+         applies=lambda attacker, defender: defender.status['has_cover'],
+         side='defender'),
+    Step('trace cover', _trace('cover applied'),
+         applies=lambda attacker, defender: defender.status['has_cover'],
+         modes=('traced',)),
+
+    # ------Attacker modifies defender's dice------
+    # Apply pierce if attacker rolled a wild
+    Step('pierce', _pierce, lambda engine: engine._apply_pierce,
+         applies=lambda attacker, defender: attacker.status['pierce_on_wild'],
+         side='defender'),
+    Step('trace pierce', _trace_pierce,
+         applies=lambda attacker, defender: attacker.status['pierce_on_wild'],
+         modes=('traced',)),
+
+    # ------Defender modifies attacker's dice------
+    # Nothing here yet, new abilities are added with insert_step(..., before='combo')
+
+    # ------Calculate results------
+    Step('combo', _combo_check, lambda engine: engine._check_combos,
+         applies=lambda attacker, defender: len(attacker.combo) > 0,
+         side='attacker'),
+    Step('trace result', _trace_result, modes=('traced',)),
+)
@@ -1,6 +1,22 @@
 import random
 from collections import Counter
 
+from alias import exploded_table
+from faces import FACE_INDEX, FACES, NO_COUNTS, RESULTS, SIDE_FACES, FaceCountPool, \
+    from_counts, to_counts
+
+# The sides of the die other than crits and wilds
+OTHER_RESULTS = [result for result in RESULTS if result not in ('crit', 'wild')]
+
+# The 8 sides of the die map exactly to 3 random bits, so the results of 4 dice are
+# decoded at once from each 12 bits
+BITS_PER_DIE = 3
+DICE_PER_CHUNK = 4
+CHUNK_MASK = (1 << BITS_PER_DIE * DICE_PER_CHUNK) - 1
+CHUNK_RESULTS = [tuple(RESULTS[chunk >> BITS_PER_DIE * die & 7]
+                       for die in range(DICE_PER_CHUNK))
+                 for chunk in range(CHUNK_MASK + 1)]
+
 
 class Player():
     """The parent class for Attacker and Defender that has all the generic
@@ -9,11 +25,12 @@ class Player():
     """
 
     # A list of the 8 sides of the die
-    RESULTS = ['crit', 'wild', 'hit', 'hit', 'block', 'blank', 'blank', 'skull']
+    RESULTS = RESULTS
 
     def __init__(self, num_dice, num_rerolls=0, can_reroll_skulls=False,
                  dr_strange_reroll=(False, 0), is_hexed=False, counts_blanks=False,
-                 counts_skulls=False):
+                 counts_skulls=False, use_face_counts=False, use_alias_tables=False,
+                 rng=None):
         """Initialise the player.
 
         Args:
@@ -31,11 +48,33 @@ class Player():
                 Defaults to False.
             counts_skulls (bool, optional): Whether skulls are counted as successes.
                 Defaults to False.
+            use_face_counts (bool, optional): Whether the dice pool is stored as a
+                face-count vector instead of a list, with dice rolled, rerolled and
+                counted as whole faces. Defaults to False.
+            use_alias_tables (bool, optional): Whether the initial roll and the
+                explosion of its crits are drawn at once from a precomputed alias
+                table over the face counts after the explosion, so explode_crits
+                does nothing. Defaults to False.
+            rng (random.Random, optional): The random number generator used to roll
+                dice. Defaults to None, which uses the global random module.
         """
         # Set the 2 numeric values
         self.num_dice = num_dice
         self.num_rerolls = num_rerolls
 
+        # Set the random number generator (the global random module if not given)
+        self.rng = random if rng is None else rng
+
+        # Set the dice pool representation
+        self.use_face_counts = use_face_counts
+        # Whether each face is a success, and the faces which can be rerolled in
+        # order of preference, for face-count pools
+        self._success_mask = None
+        self._fail_faces = None
+
+        # Set how dice are rolled
+        self.use_alias_tables = use_alias_tables
+
         # Set the value for Dr Strange reroll threshold from the passed tuple
         self.dr_strange_reroll_threshold = dr_strange_reroll[1]
 
@@ -71,20 +110,181 @@ class Player():
         else:
             self.rerollable_fails.append('blank')
 
+    def __getstate__(self):
+        """Get the state for pickling or copying, e.g. to send the player to another
+        process. The global random module can't be pickled, so it is restored on
+        unpickling. Methods wrapped on the instance, e.g. by a PhaseProfiler, are left
+        out, as they are bound to this player rather than the copy.
+
+        Returns:
+            dict: The player's attributes.
+        """
+        state = {name: value for name, value in self.__dict__.items()
+                 if not callable(getattr(type(self), name, None))}
+        if state['rng'] is random:
+            state['rng'] = None
+        return state
+
+    def __setstate__(self, state):
+        """Restore the state after unpickling.
+
+        Args:
+            state (dict): The player's attributes.
+        """
+        if state['rng'] is None:
+            state['rng'] = random
+        self.__dict__.update(state)
+
     def initial_roll(self):
         """Choose a random result for each die being rolled and add it to a list called
-        dice pool.
+        dice pool. With alias tables, the crits are exploded as part of the roll.
+        """
+        if self.use_alias_tables:
+            counts = self._roll_exploded(self.num_dice)
+            if self.use_face_counts:
+                self.dice_pool = self._make_count_pool(counts)
+            else:
+                self.dice_pool = from_counts(counts)
+        elif self.use_face_counts:
+            self.dice_pool = self._make_count_pool(self._roll_counts(self.num_dice))
+        else:
+            self.dice_pool = self._roll_dice(self.num_dice)
+
+    def conditioned_roll(self, num_crits, num_wilds):
+        """Roll the initial dice pool given exactly how many crits and wilds it has,
+        e.g. for stratified sampling.
+
+        Args:
+            num_crits (int): The number of crits rolled.
+            num_wilds (int): The number of wilds rolled.
+        """
+        self.dice_pool = self._make_pool(
+            self._roll_conditioned(self.num_dice, num_crits, num_wilds))
+
+    def conditioned_explode(self, num_crits, num_wilds):
+        """Explode the crits in the dice pool given exactly how many crits and wilds
+        the new dice roll, e.g. for stratified sampling.
+
+        Args:
+            num_crits (int): The number of crits rolled on the new dice.
+            num_wilds (int): The number of wilds rolled on the new dice.
         """
-        self.dice_pool = [random.choice(self.RESULTS) for _ in range(self.num_dice)]
+        self.dice_pool.extend(self._roll_conditioned(self.dice_pool.count('crit'),
+                                                     num_crits, num_wilds))
+
+    def _roll_conditioned(self, num_dice, num_crits, num_wilds):
+        """Roll a number of dice given exactly how many crits and wilds they roll.
+        The other dice are rolled on the remaining sides.
+
+        Args:
+            num_dice (int): The number of dice to roll.
+            num_crits (int): The number of crits rolled.
+            num_wilds (int): The number of wilds rolled.
+
+        Returns:
+            list[str]: The die results.
+        """
+        choice = self.rng.choice
+        results = ['crit'] * num_crits + ['wild'] * num_wilds
+        results.extend(choice(OTHER_RESULTS)
+                       for _ in range(num_dice - num_crits - num_wilds))
+        return results
+
+    def _roll_dice(self, num_dice):
+        """Choose a random result for each of a number of dice.
+
+        Args:
+            num_dice (int): The number of dice to roll.
+
+        Returns:
+            list[str]: The die results.
+        """
+        if num_dice == 0:
+            return []
+        # Draw 3 bits for every die in one call and decode them 4 dice at a time
+        bits = self.rng.getrandbits(BITS_PER_DIE * num_dice)
+        results = []
+        extend = results.extend
+        for _ in range((num_dice + DICE_PER_CHUNK - 1) // DICE_PER_CHUNK):
+            extend(CHUNK_RESULTS[bits & CHUNK_MASK])
+            bits >>= BITS_PER_DIE * DICE_PER_CHUNK
+        # The last chunk can decode more dice than were rolled
+        del results[num_dice:]
+        return results
+
+    def _roll_counts(self, num_dice):
+        """Roll a number of dice straight into a face-count vector.
+
+        Args:
+            num_dice (int): The number of dice to roll.
+
+        Returns:
+            list[int]: The number of each face rolled in FACES order.
+        """
+        counts = [0] * len(FACES)
+        if num_dice == 0:
+            return counts
+        # Draw 3 bits for every die in one call and count the face of each
+        bits = self.rng.getrandbits(BITS_PER_DIE * num_dice)
+        for shift in range(0, BITS_PER_DIE * num_dice, BITS_PER_DIE):
+            counts[SIDE_FACES[bits >> shift & 7]] += 1
+        return counts
+
+    def _roll_exploded(self, num_dice):
+        """Roll a number of dice and explode their crits with one draw from a
+        precomputed alias table over the face counts after the explosion.
+
+        Args:
+            num_dice (int): The number of dice being rolled initially.
+
+        Returns:
+            tuple[int]: The number of each face after crits explode in FACES order.
+        """
+        return exploded_table(num_dice, self.status['is_hexed']).sample(self.rng)
+
+    def _make_pool(self, results):
+        """Create a dice pool in the chosen representation.
+
+        Args:
+            results (list[str]): The die results in the pool.
+
+        Returns:
+            list[str] or FaceCountPool: The dice pool.
+        """
+        if self.use_face_counts:
+            return self._make_count_pool(to_counts(results))
+        return results
+
+    def _make_count_pool(self, counts):
+        """Create a face-count dice pool.
+
+        Args:
+            counts (list[int]): The number of each face in FACES order.
+
+        Returns:
+            FaceCountPool: The dice pool.
+        """
+        # Subclasses add to the success results and rerollable failures after
+        # initialisation, so the face indices are built on first use
+        if self._success_mask is None:
+            self._success_mask = tuple(face in self.success_results for face in FACES)
+            self._fail_faces = tuple(FACE_INDEX[face] for face in self.rerollable_fails)
+        return FaceCountPool(counts, self._success_mask)
 
     def explode_crits(self):
         """For each crit result in the dice pool, add a new random result to the pool.
         This simulates the exploding of crits where each crit lets the player roll a
         new die.
         """
+        # The initial roll from an alias table already includes the exploded crits
+        if self.use_alias_tables:
+            return
         num_crits = self.dice_pool.count('crit')
-        for _ in range(num_crits):
-            self.dice_pool.append(random.choice(self.RESULTS))
+        if self.use_face_counts:
+            if num_crits > 0:
+                self.dice_pool.add_counts(self._roll_counts(num_crits))
+        else:
+            self.dice_pool.extend(self._roll_dice(num_crits))
 
     def _change_die(self, old_value, new_value):
         """Replace the first instance of a result in the dice pool with another.
@@ -93,11 +293,46 @@ class Player():
             old_value (str): The die rersult being replaced.
             new_value (str): The new die result.
         """
+        if self.use_face_counts:
+            self.dice_pool.replace(old_value, new_value)
+            return
         for index, result in enumerate(self.dice_pool):
             if result == old_value:
                 self.dice_pool[index] = new_value
                 break
 
+    def get_config(self):
+        """Get the constructor parameters that decide how the player's dice are
+        resolved. The dice pool representation and how dice are rolled are left out
+        as they don't change the results.
+
+        Returns:
+            dict: The constructor parameters by name.
+        """
+        return {
+            'num_dice': self.num_dice,
+            'num_rerolls': self.num_rerolls,
+            'can_reroll_skulls': self.status['can_reroll_skulls'],
+            'dr_strange_reroll': (self.status['dr_strange_reroll'],
+                                  self.dr_strange_reroll_threshold),
+            'is_hexed': self.status['is_hexed'],
+            'counts_blanks': self.status['counts_blanks'],
+            'counts_skulls': self.status['counts_skulls']
+        }
+
+    def get_config_key(self):
+        """Get a canonical hashable key for the player's configuration, so that
+        players which resolve their dice in the same way have equal keys.
+
+        Returns:
+            tuple: The player type and its sorted constructor parameters.
+        """
+        config = self.get_config()
+        # The threshold is unused unless the Dr Strange reroll is available
+        if not config['dr_strange_reroll'][0]:
+            config['dr_strange_reroll'] = (False, 0)
+        return (type(self).__name__, tuple(sorted(config.items())))
+
     def get_text(self):
         """Give an overview of the player as a formatted string.
 
@@ -138,6 +373,9 @@ class Player():
         Returns:
             int: The number of successful results.
         """
+        # The face-count pool counts its successes by face
+        if self.use_face_counts:
+            return self.dice_pool.successes
         # Count the dice results
         count = Counter(self.dice_pool)
         return sum([count[result] for result in self.success_results])
@@ -154,13 +392,37 @@ class Player():
         # Create a reroll pool by selecting failure results equal to number of rerolls
         reroll_pool = failures[:self.num_rerolls]
         # Randomise the results in the reroll pool to create a new list of results
-        updated_reroll_pool = [random.choice(self.RESULTS) for result in reroll_pool]
+        updated_reroll_pool = self._roll_dice(len(reroll_pool))
         # Remove old results from the dice pool
         for result in reroll_pool:
             self.dice_pool.remove(result)
         # Append replacement results to end of dice pool
         self.dice_pool.extend(updated_reroll_pool)
 
+    def _reroll_counts(self, protected=NO_COUNTS):
+        """Update a face-count dice pool with new random results for the number of
+        rerolls, rerolling failures by face in the preferred order.
+
+        Args:
+            protected (tuple[int], optional): The number of each face which can't be
+                rerolled, e.g. dice kept for a combo. Defaults to none.
+        """
+        counts = self.dice_pool.counts
+        remaining = self.num_rerolls
+        # Take failures from each face in preferred reroll order (skulls > blanks >
+        # blocks/hits) until the rerolls run out
+        for index in self._fail_faces:
+            available = counts[index] - protected[index]
+            if available > 0:
+                taken = min(available, remaining)
+                counts[index] -= taken
+                remaining -= taken
+                if remaining == 0:
+                    break
+        num_rerolled = self.num_rerolls - remaining
+        if num_rerolled > 0:
+            self.dice_pool.add_counts(self._roll_counts(num_rerolled))
+
     def decide_dr_strange_reroll(self, current_damage, player_type):
         """Check the criteria for a Dr Strange reroll and execute the complete reroll
         function if the criteria is met. This is based on the damage threshold, if
@@ -192,8 +454,11 @@ class Player():
     def _complete_reroll(self):
         """Update the dice pool with new random results for all dice.
         """
+        if self.use_face_counts:
+            counts = self._roll_counts(len(self.dice_pool))
+            self.dice_pool = self._make_count_pool(counts)
+            return
         # Create a list of random results equal to the length of the current dice pool
-        updated_dice_pool = [random.choice(self.RESULTS) for i in
-                             range(len(self.dice_pool))]
+        updated_dice_pool = self._roll_dice(len(self.dice_pool))
         # Swap the old results for the new ones in the dice pool
         self.dice_pool = updated_dice_pool
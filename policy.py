@@ -0,0 +1,74 @@
+from attacker import Attacker
+from exact import ExactEngine
+from sweep import mean_damage
+
+# The objectives a reroll policy can be chosen for
+OBJECTIVES = ('damage', 'combo')
+
+
+def optimize_dr_strange_reroll(attacker, defender, objective='damage',
+                               thresholds=None):
+    """Find the attacker's Dr Strange reroll policy, i.e. the damage threshold and
+    whether achieved combos are rerolled, with the best exact expected damage or
+    combo rate against a defender. Every threshold for a rerolls_combos choice is
+    calculated in one pass over the attacker's dice pools (see
+    ExactEngine.get_threshold_distributions), and the defender's outcomes are shared
+    by every candidate.
+
+    Args:
+        attacker (Attacker): The Attacker object. Its own Dr Strange reroll settings
+            are ignored.
+        defender (Defender): The Defender object.
+        objective (str, optional): 'damage' to maximise the mean damage or 'combo'
+            to maximise the combo success rate. Defaults to 'damage'.
+        thresholds (list[int], optional): The damage thresholds to try. Defaults to
+            every threshold that gives a different policy.
+
+    Raises:
+        ValueError: If the objective is not recognised.
+
+    Returns:
+        tuple: The best policy, as a dict of the 'dr_strange_reroll' (tuple) and
+            'rerolls_combos' (bool) constructor values, and a dict of every
+            candidate's (dr_strange_reroll, rerolls_combos) pair mapped to its score
+            (float). A threshold of -1 is the success rate heuristic.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f'Unknown objective: {objective!r}')
+    if thresholds is None:
+        # The current damage can't be more than every die after crits explode plus
+        # one for pierce, and a threshold of 0 never rerolls
+        thresholds = range(2 * attacker.num_dice + 2)
+
+    def score(distribution):
+        if objective == 'combo':
+            return sum(probability for (_, combo), probability in distribution.items()
+                       if combo)
+        pmf = {}
+        for (damage, _), probability in distribution.items():
+            pmf[damage] = pmf.get(damage, 0.0) + probability
+        return mean_damage(pmf)
+
+    config = attacker.get_config()
+    # Whether combos are rerolled only matters if there is one
+    combo_choices = [True, False] if config['combo'][0] else [True]
+    # Player configurations shared by every engine, so the defender's outcomes are
+    # only worked out once
+    sides = {}
+    scores = {}
+    for rerolls_combos in combo_choices:
+        config['combo'] = (config['combo'][0], rerolls_combos)
+        config['dr_strange_reroll'] = (True, 0)
+        engine = ExactEngine(Attacker(**config), defender, sides)
+        for threshold, distribution in engine.get_threshold_distributions(
+                thresholds).items():
+            scores[((True, threshold), rerolls_combos)] = score(distribution)
+        # The success rate heuristic doesn't depend on the current damage, so is
+        # calculated on its own
+        config['dr_strange_reroll'] = (True, -1)
+        engine = ExactEngine(Attacker(**config), defender, sides)
+        scores[((True, -1), rerolls_combos)] = score(engine.get_distribution())
+
+    dr_strange_reroll, rerolls_combos = max(scores, key=scores.get)
+    return ({'dr_strange_reroll': dr_strange_reroll,
+             'rerolls_combos': rerolls_combos}, scores)
@@ -0,0 +1,153 @@
+import time
+from functools import wraps
+
+# The player methods timed for each phase of an attack
+PHASE_METHODS = {
+    'initial roll': ['initial_roll'],
+    'crit explosion': ['explode_crits'],
+    'dr strange decision': ['decide_dr_strange_reroll'],
+    'standard reroll': ['reroll'],
+    'cover': ['apply_cover'],
+    'pierce': ['apply_pierce'],
+    'combo check': ['check_combo'],
+}
+
+
+class PhaseProfiler():
+    """Collects the number of calls, cumulative time and dice touched for each phase
+    of the attacks resolved by a simulation. It wraps the players' methods while
+    attached, so a simulation without a profiler runs exactly as before.
+    """
+
+    def __init__(self):
+        """Initialise an empty profiler.
+        """
+        self.stats = {phase: {'calls': 0, 'time': 0.0, 'dice': 0}
+                      for phase in PHASE_METHODS}
+        self._players = []
+        # The phase currently being timed, so nested calls (e.g. a combo check during
+        # a reroll) are counted as part of the outer phase
+        self._active = None
+
+    def attach(self, *players):
+        """Start profiling the phases of some players.
+
+        Args:
+            *players (Player): The players to profile.
+        """
+        for player in players:
+            for phase, method_names in PHASE_METHODS.items():
+                for method_name in method_names:
+                    if hasattr(player, method_name):
+                        setattr(player, method_name,
+                                self._wrap_phase(phase, getattr(player, method_name)))
+            # Count the dice rolled or changed by each phase
+            player._roll_dice = self._wrap_roll(player._roll_dice)
+            player._roll_counts = self._wrap_roll(player._roll_counts)
+            player._roll_exploded = self._wrap_roll(player._roll_exploded)
+            player._change_die = self._wrap_change(player._change_die)
+            self._players.append(player)
+
+    def detach(self):
+        """Stop profiling, restoring the players' own methods.
+        """
+        for player in self._players:
+            for method_names in PHASE_METHODS.values():
+                for method_name in method_names:
+                    player.__dict__.pop(method_name, None)
+            player.__dict__.pop('_roll_dice', None)
+            player.__dict__.pop('_roll_counts', None)
+            player.__dict__.pop('_roll_exploded', None)
+            player.__dict__.pop('_change_die', None)
+        self._players = []
+
+    def reset(self):
+        """Clear the collected statistics.
+        """
+        for stats in self.stats.values():
+            stats.update(calls=0, time=0.0, dice=0)
+
+    def get_report(self):
+        """Get the collected statistics for each phase that was called.
+
+        Returns:
+            dict: Each phase mapped to its number of calls (int), cumulative time in
+                seconds (float), dice touched (int), and share of the total time
+                across phases (float).
+        """
+        total_time = sum(stats['time'] for stats in self.stats.values())
+        return {phase: dict(stats, share=stats['time'] / total_time if total_time
+                            else 0.0)
+                for phase, stats in self.stats.items() if stats['calls'] > 0}
+
+    def format_report(self):
+        """Format the report as a text table.
+
+        Returns:
+            str: One line per phase, most expensive first.
+        """
+        lines = [f'{"Phase":<20}{"Calls":>12}{"Time (s)":>12}{"Dice":>12}{"Share":>8}']
+        report = sorted(self.get_report().items(), key=lambda item: -item[1]['time'])
+        for phase, stats in report:
+            lines.append(f'{phase:<20}{stats["calls"]:>12}{stats["time"]:>12.4f}'
+                         f'{stats["dice"]:>12}{stats["share"]:>8.1%}')
+        return '\n'.join(lines)
+
+    def _wrap_phase(self, phase, method):
+        """Wrap a player method to time it as a phase.
+
+        Args:
+            phase (str): The phase name.
+            method (callable): The bound player method.
+
+        Returns:
+            callable: The timed method.
+        """
+        @wraps(method)
+        def timed(*args, **kwargs):
+            if self._active is not None:
+                return method(*args, **kwargs)
+            self._active = phase
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                stats = self.stats[phase]
+                stats['time'] += time.perf_counter() - start
+                stats['calls'] += 1
+                self._active = None
+        return timed
+
+    def _wrap_roll(self, method):
+        """Wrap a player's _roll_dice, _roll_counts or _roll_exploded to count the dice
+        rolled in the active phase.
+
+        Args:
+            method (callable): The bound _roll_dice, _roll_counts or _roll_exploded
+                method.
+
+        Returns:
+            callable: The counting method.
+        """
+        @wraps(method)
+        def counted(num_dice):
+            if self._active is not None:
+                self.stats[self._active]['dice'] += num_dice
+            return method(num_dice)
+        return counted
+
+    def _wrap_change(self, method):
+        """Wrap a player's _change_die to count the dice changed in the active phase.
+
+        Args:
+            method (callable): The bound _change_die method.
+
+        Returns:
+            callable: The counting method.
+        """
+        @wraps(method)
+        def counted(old_value, new_value):
+            if self._active is not None:
+                self.stats[self._active]['dice'] += 1
+            return method(old_value, new_value)
+        return counted
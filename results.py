@@ -0,0 +1,209 @@
+import numpy as np
+
+from stats import ResultAccumulator
+
+
+class ResultArray():
+    """A compact store of attack results, holding the damage of each attack in the
+    smallest suitable integer array and whether the combo was achieved as a
+    bit-packed mask, i.e. one byte per attack plus one bit rather than a tuple.
+    Contiguous slices are views sharing the same arrays, and the arrays can be saved
+    to .npz or memory-mapped .npy files and loaded back.
+    """
+
+    def __init__(self, damage, packed_combos, offset=0):
+        """Initialise the results from existing arrays without copying them.
+
+        Args:
+            damage (ndarray): The damage dealt by each attack.
+            packed_combos (ndarray): Whether the combo was achieved in each attack,
+                packed 8 attacks to a byte with np.packbits(bitorder='little').
+            offset (int, optional): The position in the packed mask of the first
+                attack's bit. Defaults to 0.
+        """
+        self.damage = damage
+        self.packed_combos = packed_combos
+        self.offset = offset
+
+    @classmethod
+    def from_results(cls, results, max_damage=None):
+        """Create compact results from a list of result tuples.
+
+        Args:
+            results (list[tuple]): Each damage output (int) and whether the combo was
+                achieved (bool), as from Simulation.generate_results.
+            max_damage (int, optional): The highest possible damage, used to choose
+                the damage array type. Defaults to the highest damage in the results.
+
+        Returns:
+            ResultArray: The compact results.
+        """
+        damage = np.fromiter((result[0] for result in results), dtype=np.int64,
+                             count=len(results))
+        combos = np.fromiter((result[1] for result in results), dtype=bool,
+                             count=len(results))
+        if max_damage is None:
+            max_damage = int(damage.max()) if len(damage) else 0
+        return cls(damage.astype(np.min_scalar_type(max_damage)),
+                   np.packbits(combos, bitorder='little'))
+
+    @classmethod
+    def from_chunks(cls, num_sims, chunks, max_damage):
+        """Create compact results by filling preallocated arrays one chunk at a time,
+        so the full results are never held in a larger form.
+
+        Args:
+            num_sims (int): The total number of attacks in the chunks.
+            chunks (iterable[tuple]): The damage (ndarray) and whether the combo was
+                achieved (ndarray) for each chunk of attacks. Every chunk but the last
+                must hold a multiple of 8 attacks.
+            max_damage (int): The highest possible damage, used to choose the damage
+                array type.
+
+        Returns:
+            ResultArray: The compact results.
+        """
+        damage = np.empty(num_sims, dtype=np.min_scalar_type(max_damage))
+        packed_combos = np.empty((num_sims + 7) // 8, dtype=np.uint8)
+        start = 0
+        for chunk_damage, chunk_combos in chunks:
+            stop = start + len(chunk_damage)
+            damage[start:stop] = chunk_damage
+            packed = np.packbits(chunk_combos, bitorder='little')
+            packed_combos[start // 8:start // 8 + len(packed)] = packed
+            start = stop
+        return cls(damage, packed_combos)
+
+    @classmethod
+    def load(cls, path, mmap=False):
+        """Load results saved with save or save_memmap.
+
+        Args:
+            path (str): The .npz file, or the path prefix given to save_memmap.
+            mmap (bool, optional): Whether the path is a save_memmap prefix whose
+                arrays are memory-mapped read-only rather than read into memory.
+                Defaults to False.
+
+        Returns:
+            ResultArray: The loaded results.
+        """
+        if mmap:
+            return cls(np.load(f'{path}.damage.npy', mmap_mode='r'),
+                       np.load(f'{path}.combos.npy', mmap_mode='r'))
+        with np.load(path) as arrays:
+            return cls(arrays['damage'], arrays['combos'])
+
+    def __len__(self):
+        return len(self.damage)
+
+    def __getitem__(self, index):
+        """Get the result of one attack, or a view of a contiguous slice of attacks.
+
+        Args:
+            index (int or slice): The attack number or slice.
+
+        Raises:
+            ValueError: If a slice has a step other than 1.
+
+        Returns:
+            tuple or ResultArray: The damage (int) and whether the combo was achieved
+                (bool), or the results for the slice.
+        """
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError('Only contiguous slices are supported')
+            stop = max(start, stop)
+            bit = self.offset + start
+            end = self.offset + stop
+            # The packed mask is sliced to whole bytes and the bit offset kept
+            return ResultArray(self.damage[start:stop],
+                               self.packed_combos[bit // 8:(end + 7) // 8], bit % 8)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('Result index out of range')
+        bit = self.offset + index
+        return (int(self.damage[index]),
+                bool(self.packed_combos[bit // 8] >> (bit % 8) & 1))
+
+    def __iter__(self):
+        return zip(self.damage.tolist(), self.get_combos().tolist())
+
+    def get_combos(self):
+        """Get whether the combo was achieved in each attack, unpacked.
+
+        Returns:
+            ndarray: A bool for each attack.
+        """
+        bits = np.unpackbits(self.packed_combos, count=self.offset + len(self),
+                             bitorder='little')
+        return bits[self.offset:].view(bool)
+
+    def histogram(self):
+        """Get the number of attacks dealing each damage.
+
+        Returns:
+            ndarray: The number of attacks dealing each damage (by index).
+        """
+        return np.bincount(self.damage)
+
+    def mean(self):
+        """Get the mean damage.
+
+        Returns:
+            float: The mean damage.
+        """
+        return float(self.damage.mean(dtype=np.float64))
+
+    def combo_rate(self):
+        """Get the proportion of attacks achieving the combo.
+
+        Returns:
+            float: The combo success rate.
+        """
+        return int(np.count_nonzero(self.get_combos())) / len(self)
+
+    def to_accumulator(self):
+        """Count the results into an accumulator, e.g. for its confidence intervals.
+
+        Returns:
+            ResultAccumulator: The accumulator holding the results.
+        """
+        accumulator = ResultAccumulator()
+        accumulator.add_counts(self.histogram().tolist(),
+                               np.bincount(self.damage[self.get_combos()]).tolist())
+        return accumulator
+
+    def save(self, path, compressed=False):
+        """Save the results to an .npz file.
+
+        Args:
+            path (str): The file to write.
+            compressed (bool, optional): Whether to compress the arrays.
+                Defaults to False.
+        """
+        savez = np.savez_compressed if compressed else np.savez
+        savez(path, damage=self.damage, combos=self._aligned_combos())
+
+    def save_memmap(self, path):
+        """Save the results to a pair of .npy files which can be loaded memory-mapped,
+        e.g. so several processes share one copy of the results.
+
+        Args:
+            path (str): The path prefix of the files, which are written to
+                PATH.damage.npy and PATH.combos.npy.
+        """
+        np.save(f'{path}.damage.npy', self.damage)
+        np.save(f'{path}.combos.npy', self._aligned_combos())
+
+    def _aligned_combos(self):
+        """Get the packed combo mask starting at the first attack's bit, repacking it
+        if this is a view with a bit offset.
+
+        Returns:
+            ndarray: The packed combo mask.
+        """
+        if self.offset == 0:
+            return self.packed_combos[:(len(self) + 7) // 8]
+        return np.packbits(self.get_combos(), bitorder='little')
@@ -0,0 +1,260 @@
+import argparse
+import csv
+import json
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from cache import ResultCache
+from server import build_simulation, get_num_sims, run_query
+
+# The players whose constructor parameters are given as prefixed CSV columns
+PLAYERS = ('attacker', 'defender')
+
+
+def read_scenarios(path):
+    """Read scenarios one at a time from a CSV or JSON Lines file, so the file is
+    never held in memory.
+
+    JSON Lines files have one object per line with the same parameters as a server
+    query, e.g. {"attacker": {"num_dice": 6}, "defender": {"num_dice": 3},
+    "num_sims": 10000}. CSV files have a column for each parameter, with player
+    parameters prefixed by the player, e.g. attacker.num_dice. Each cell is read as
+    JSON where possible (e.g. true, 6 or ["hit", "crit"]) and empty cells are left
+    out. A line which isn't a JSON object gives a scenario with only an 'error'
+    message, so one bad line doesn't stop the rest of the file being run.
+
+    Args:
+        path (str): The file, ending in .csv for CSV and anything else for JSON Lines.
+
+    Yields:
+        dict: The parameters of each scenario.
+    """
+    with open(path, newline='') as file:
+        if path.endswith('.csv'):
+            for row in csv.DictReader(file):
+                yield _parse_row(row)
+        else:
+            for line in file:
+                if line.strip():
+                    yield _parse_line(line.strip())
+
+
+def run_scenarios(scenarios, workers=None, cache_size=1024, max_pending=None):
+    """Run scenarios across a pool of processes, yielding each row's result as soon
+    as it is ready. Scenarios with the same canonical configuration, engine, number
+    of sims and seed are only run once: repeats of a finished scenario come from a
+    cache, and repeats of a running one wait for it. Only a bounded number of
+    scenarios are read ahead of the results, so memory stays flat however many rows
+    there are.
+
+    Args:
+        scenarios (iterable[dict]): The parameters of each scenario, e.g. from
+            read_scenarios.
+        workers (int, optional): The number of processes. Defaults to None, which
+            uses the number of CPUs, and 1 runs every scenario in this process.
+        cache_size (int, optional): The number of finished results kept for
+            repeated scenarios. Defaults to 1024.
+        max_pending (int, optional): The most rows waiting on scenarios running or
+            queued at once, including repeats. Defaults to 4 per worker.
+
+    Yields:
+        tuple: The row number (int), counting from 0, and the summary of its results
+            (dict), or a dict with an 'error' message if the scenario is invalid or
+            fails.
+    """
+    cache = ResultCache(cache_size)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers == 1:
+        for row, params in enumerate(scenarios):
+            yield row, _run_cached(cache, params)
+        return
+
+    if max_pending is None:
+        max_pending = 4 * workers
+    executor = ProcessPoolExecutor(max_workers=workers)
+    # The rows waiting for each running scenario, by key and by future
+    pending = {}
+    keys = {}
+    try:
+        for row, params in enumerate(scenarios):
+            try:
+                key = _get_key(params)
+            except Exception as error:
+                yield row, _error(error)
+                continue
+            cached = cache.get(key)
+            if cached is not None:
+                yield row, cached
+            elif key in pending:
+                pending[key].append(row)
+            else:
+                pending[key] = [row]
+                keys[executor.submit(run_query, params)] = key
+            # Wait for a scenario to finish before reading any further, counting the
+            # repeats of running scenarios as well so their rows stay bounded too
+            while keys and sum(map(len, pending.values())) >= max_pending:
+                yield from _collect(keys, pending, cache)
+        while keys:
+            yield from _collect(keys, pending, cache)
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def write_results(results, file):
+    """Write each row's result as a line of JSON as soon as it is ready.
+
+    Args:
+        results (iterable[tuple]): Each row number and result, e.g. from
+            run_scenarios.
+        file (file): The file to write to.
+    """
+    for row, result in results:
+        file.write(json.dumps({'row': row, **result}) + '\n')
+        file.flush()
+
+
+def _parse_row(row):
+    """Convert a CSV row to scenario parameters.
+
+    Args:
+        row (dict): Each column name mapped to its cell.
+
+    Returns:
+        dict: The scenario parameters.
+    """
+    params = {player: {} for player in PLAYERS}
+    for column, cell in row.items():
+        if cell is None or cell == '':
+            continue
+        try:
+            value = json.loads(cell)
+        except json.JSONDecodeError:
+            value = cell
+        player, _, name = column.partition('.')
+        if name and player in PLAYERS:
+            params[player][name] = value
+        else:
+            params[column] = value
+    return params
+
+
+def _parse_line(line):
+    """Convert a JSON Lines line to scenario parameters.
+
+    Args:
+        line (str): The line.
+
+    Returns:
+        dict: The scenario parameters, or a dict with only an 'error' message if the
+            line isn't a JSON object.
+    """
+    try:
+        params = json.loads(line)
+    except json.JSONDecodeError as error:
+        return {'error': f'Invalid JSON: {error}'}
+    if not isinstance(params, dict):
+        return {'error': 'The scenario must be a JSON object'}
+    return params
+
+
+def _get_key(params):
+    """Get the canonical key of a scenario, as used by the server's cache.
+
+    Args:
+        params (dict): The scenario parameters.
+
+    Raises:
+        ValueError: If the scenario is an error from reading the file.
+
+    Returns:
+        tuple: The players' configuration keys, engine, number of sims and seed.
+    """
+    if 'error' in params:
+        raise ValueError(params['error'])
+    sim = build_simulation(params)
+    return sim.get_config_key() + (params.get('engine', 'scalar'), get_num_sims(params),
+                                   params.get('seed'))
+
+
+def _error(error):
+    """Build the result of a scenario which failed.
+
+    Args:
+        error (Exception): The error raised by the scenario.
+
+    Returns:
+        dict: The 'error' message, with the type of any error other than an invalid
+            parameter.
+    """
+    if isinstance(error, (KeyError, TypeError, ValueError)):
+        return {'error': str(error)}
+    return {'error': f'{type(error).__name__}: {error}'}
+
+
+def _run_cached(cache, params):
+    """Run a scenario in this process, reusing the result of an identical scenario.
+
+    Args:
+        cache (ResultCache): The finished results.
+        params (dict): The scenario parameters.
+
+    Returns:
+        dict: The summary of the results, or a dict with an 'error' message.
+    """
+    try:
+        return cache.get_or_compute(_get_key(params), lambda: run_query(params))
+    except Exception as error:
+        return _error(error)
+
+
+def _collect(keys, pending, cache):
+    """Wait for at least one running scenario to finish and give the results for its
+    rows.
+
+    Args:
+        keys (dict): The key of each running scenario by its future.
+        pending (dict): The rows waiting for each running scenario by key.
+        cache (ResultCache): The finished results, which the new results are added to.
+
+    Yields:
+        tuple: Each row number and its result.
+    """
+    done, _ = wait(keys, return_when=FIRST_COMPLETED)
+    for future in done:
+        key = keys.pop(future)
+        try:
+            result = future.result()
+            cache.put(key, result)
+        except Exception as error:
+            result = _error(error)
+        for row in pending.pop(key):
+            yield row, result
+
+
+def main(argv=None):
+    """Run scenarios from a file from the command line.
+
+    Args:
+        argv (list[str], optional): The arguments, or None to use sys.argv.
+            Defaults to None.
+    """
+    parser = argparse.ArgumentParser(
+        description='Run matchup scenarios from a CSV or JSON Lines file.')
+    parser.add_argument('path', help='the scenario file (.csv or JSON Lines)')
+    parser.add_argument('--output', help='the results file (default: stdout)')
+    parser.add_argument('--workers', type=int,
+                        help='the number of processes (default: the number of CPUs)')
+    args = parser.parse_args(argv)
+
+    results = run_scenarios(read_scenarios(args.path), args.workers)
+    if args.output:
+        with open(args.output, 'w') as file:
+            write_results(results, file)
+    else:
+        write_results(results, sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+from collections import defaultdict
+
+from exact import ExactEngine
+
+
+def attack_sequence(attackers, defender, health):
+    """Calculate the exact distribution of a defender's remaining health after a
+    sequence of attacks. Each attack's damage distribution is calculated once with
+    the exact engine, and the attacks are chained as a Markov chain over the
+    defender's remaining health rather than by simulating every combination.
+
+    Args:
+        attackers (list[Attacker]): The Attacker objects, in the order they attack.
+        defender (Defender): The Defender object, which defends every attack.
+        health (int): The defender's health before the first attack.
+
+    Returns:
+        list[dict]: For each attack, each remaining health (int) mapped to its
+            probability (float) after that attack, in ascending order of health.
+            A remaining health of 0 means the defender has been knocked out.
+    """
+    # Player configurations shared by every engine, so the defender's outcomes and
+    # repeated attackers are only worked out once
+    sides = {}
+    pmfs = {}
+    distribution = {health: 1.0}
+    distributions = []
+    for attacker in attackers:
+        key = attacker.get_config_key()
+        if key not in pmfs:
+            pmfs[key] = ExactEngine(attacker, defender, sides).get_damage_pmf()
+        next_distribution = defaultdict(float)
+        for remaining, probability in distribution.items():
+            # A knocked out defender takes no more damage
+            if remaining == 0:
+                next_distribution[0] += probability
+                continue
+            for damage, damage_probability in pmfs[key].items():
+                next_distribution[max(remaining - damage, 0)] += (probability *
+                                                                  damage_probability)
+        distribution = dict(sorted(next_distribution.items()))
+        distributions.append(distribution)
+    return distributions
+
+
+def ko_probabilities(distributions):
+    """Get the probability of the defender being knocked out by each point in a
+    sequence of attacks.
+
+    Args:
+        distributions (list[dict]): The remaining health distributions from
+            attack_sequence.
+
+    Returns:
+        list[float]: The probability of the defender having been knocked out after
+            each attack.
+    """
+    return [distribution.get(0, 0.0) for distribution in distributions]
@@ -0,0 +1,256 @@
+import argparse
+import asyncio
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from cache import ResultCache
+from cli import summarise
+from simulation import Simulation
+from attacker import Attacker
+from defender import Defender
+
+# Queries with at least this many sims (and exact queries) run in the process pool,
+# so they don't hold up shorter queries
+HEAVY_SIMS = 100000
+
+# JSON-RPC error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+
+def build_simulation(params):
+    """Build a simulation from the parameters of a query.
+
+    Args:
+        params (dict): The query parameters, with 'attacker' and 'defender' dicts of
+            constructor parameters.
+
+    Returns:
+        Simulation: The simulation.
+    """
+    return Simulation(Attacker(**params['attacker']), Defender(**params['defender']))
+
+
+def get_num_sims(params):
+    """Get the number of sims of a query.
+
+    Args:
+        params (dict): The query parameters.
+
+    Raises:
+        ValueError: If the number of sims isn't a positive integer.
+
+    Returns:
+        int: The number of sims, 10000 if not given.
+    """
+    num_sims = params.get('num_sims', 10000)
+    if isinstance(num_sims, bool) or not isinstance(num_sims, int) or num_sims < 1:
+        raise ValueError(f'num_sims must be a positive integer, not {num_sims!r}')
+    return num_sims
+
+
+def run_query(params):
+    """Run a matchup query. Called in a worker thread or process.
+
+    Args:
+        params (dict): The query parameters.
+
+    Returns:
+        dict: The summary of the results.
+    """
+    return summarise(build_simulation(params), params.get('engine', 'scalar'),
+                     get_num_sims(params), params.get('seed'))
+
+
+class SimulationServer():
+    """A long-running server answering matchup queries as line-delimited JSON-RPC 2.0
+    over stdio or a local socket. Identical queries in flight at the same time share
+    one computation, repeats are served from a cache, and heavy queries run in a
+    process pool so short queries stay fast.
+    """
+
+    def __init__(self, workers=None, cache_size=1024):
+        """Initialise the server.
+
+        Args:
+            workers (int, optional): The number of processes for heavy queries.
+                Defaults to None, which uses the number of CPUs.
+            cache_size (int, optional): The number of results kept in the cache.
+                Defaults to 1024.
+        """
+        self.cache = ResultCache(cache_size)
+        self._in_flight = {}
+        self._light_executor = ThreadPoolExecutor(max_workers=1)
+        self._heavy_executor = ProcessPoolExecutor(max_workers=workers)
+
+    def close(self):
+        """Shut down the worker pools.
+        """
+        self._light_executor.shutdown()
+        self._heavy_executor.shutdown()
+
+    async def query(self, params):
+        """Answer a matchup query, sharing the work with identical queries.
+
+        Args:
+            params (dict): The query parameters.
+
+        Returns:
+            dict: The summary of the results.
+        """
+        sim = build_simulation(params)
+        engine = params.get('engine', 'scalar')
+        num_sims = get_num_sims(params)
+        key = sim.get_config_key() + (engine, num_sims, params.get('seed'))
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        # Wait for an identical query that is already running
+        if key in self._in_flight:
+            return await asyncio.shield(self._in_flight[key])
+
+        heavy = engine == 'exact' or num_sims >= HEAVY_SIMS
+        executor = self._heavy_executor if heavy else self._light_executor
+        future = asyncio.get_running_loop().run_in_executor(executor, run_query, params)
+        self._in_flight[key] = future
+        try:
+            result = await asyncio.shield(future)
+        finally:
+            del self._in_flight[key]
+        self.cache.put(key, result)
+        return result
+
+    async def handle_line(self, line):
+        """Handle one JSON-RPC request.
+
+        Args:
+            line (str): The request.
+
+        Returns:
+            dict: The JSON-RPC response, or None for a notification.
+        """
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as error:
+            return _error(None, PARSE_ERROR, str(error))
+        if not isinstance(request, dict):
+            return _error(None, INVALID_REQUEST, 'The request must be an object')
+        request_id = request.get('id')
+        if request.get('method') != 'simulate':
+            response = _error(request_id, METHOD_NOT_FOUND,
+                              f'Unknown method: {request.get("method")!r}')
+        else:
+            try:
+                result = await self.query(request.get('params', {}))
+                response = {'jsonrpc': '2.0', 'id': request_id, 'result': result}
+            except (KeyError, TypeError, ValueError) as error:
+                response = _error(request_id, INVALID_PARAMS, str(error))
+            except Exception as error:
+                # Any other failure still gets a response, so the client isn't left
+                # waiting
+                response = _error(request_id, INTERNAL_ERROR,
+                                  f'{type(error).__name__}: {error}')
+        return response if 'id' in request else None
+
+    async def serve(self, reader, write):
+        """Answer requests from a stream until it closes, writing each response as
+        soon as it is ready.
+
+        Args:
+            reader (asyncio.StreamReader): The stream of requests, one per line.
+            write (callable): A coroutine function which writes one response line.
+        """
+        tasks = set()
+
+        async def respond(line):
+            response = await self.handle_line(line)
+            if response is not None:
+                await write(json.dumps(response) + '\n')
+
+        while line := await reader.readline():
+            if line.strip():
+                task = asyncio.create_task(respond(line.decode()))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def serve_stdio(self):
+        """Answer requests on stdin with responses on stdout.
+        """
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader()
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader),
+                                     sys.stdin)
+
+        async def write(text):
+            sys.stdout.write(text)
+            sys.stdout.flush()
+
+        await self.serve(reader, write)
+
+    async def serve_socket(self, path):
+        """Answer requests from clients of a Unix domain socket.
+
+        Args:
+            path (str): The socket path.
+        """
+        async def handle_client(reader, writer):
+            async def write(text):
+                writer.write(text.encode())
+                await writer.drain()
+
+            try:
+                await self.serve(reader, write)
+            finally:
+                writer.close()
+
+        server = await asyncio.start_unix_server(handle_client, path)
+        async with server:
+            await server.serve_forever()
+
+
+def _error(request_id, code, message):
+    """Build a JSON-RPC error response.
+
+    Args:
+        request_id: The request id, or None if it couldn't be read.
+        code (int): The error code.
+        message (str): The error message.
+
+    Returns:
+        dict: The response.
+    """
+    return {'jsonrpc': '2.0', 'id': request_id,
+            'error': {'code': code, 'message': message}}
+
+
+def main():
+    """Run the server from the command line.
+    """
+    parser = argparse.ArgumentParser(
+        description='Serve matchup queries as line-delimited JSON-RPC.')
+    parser.add_argument('--socket', help='listen on a Unix socket instead of stdio')
+    parser.add_argument('--workers', type=int,
+                        help='the number of processes for heavy queries')
+    args = parser.parse_args()
+
+    server = SimulationServer(args.workers)
+    try:
+        if args.socket:
+            asyncio.run(server.serve_socket(args.socket))
+        else:
+            asyncio.run(server.serve_stdio())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == '__main__':
+    main()
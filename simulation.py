@@ -1,134 +1,610 @@
+import copy
+import random
+
+from attack_trace import AttackTrace
+from parallel import run_seeded
+from pipeline import STEPS, compile_scalar
+from stats import PairedDifference, ResultAccumulator
+
+# The fewest attacks which must differ from the most common damage before the normal
+# interval for the mean damage is trusted, as a run of identical results (e.g. no
+# damage at all against a strong defender) gives an interval of width 0
+MIN_VARIED_ATTACKS = 10
+
+
 class Simulation():
     """A class for the simulation of attacks by an attacker on a defender.
     """
 
-    def __init__(self, attacker, defender):
+    def __init__(self, attacker, defender, steps=None):
         """Initialise the simulation.
 
         Args:
             attacker (Attacker): The Attacker object.
             defender (Defender): The Defender object.
+            steps (tuple[Step], optional): The steps of the attack, e.g. from
+                pipeline.insert_step with a new ability. They must be picklable to use
+                more than one worker. Defaults to None, which uses pipeline.STEPS.
         """
+        # The steps are compiled for the players on first use in each mode, and
+        # again whenever a player or a setting the steps depend on changes
+        self._compiled = {}
         self.attacker = attacker
         self.defender = defender
+        self.steps = steps
+        # The state of the attack being resolved, shared by its steps
+        self.attacker_stratum = None
+        self.combo_result = False
 
-        # Logging is false by default and only enabled via generate_single
-        self.logging = False
-        # Create an empty log to append to if and when logging is enabled
+        # Tracing is off by default and only enabled for the attack being traced
+        self.trace = None
+        # The text log of the most recent single attack
         self.log = ''
 
+        # Profiling is off by default and only enabled via enable_profiling
+        self.profiler = None
+
+    @property
+    def attacker(self):
+        """Attacker: The Attacker object. Replacing it recompiles the steps."""
+        return self._attacker
+
+    @attacker.setter
+    def attacker(self, attacker):
+        self._attacker = attacker
+        self._compiled = {}
+
+    @property
+    def defender(self):
+        """Defender: The Defender object. Replacing it recompiles the steps."""
+        return self._defender
+
+    @defender.setter
+    def defender(self, defender):
+        self._defender = defender
+        self._compiled = {}
+
     def generate_single(self):
         """Generate a single attack resolution and a log of text.
 
         Returns:
             str: A log of text.
         """
-        # Enable logging
-        self.logging = True
-        # Resolve the attack and return the output and log
-        return self._resolve_attack(), self.log
+        # Resolve a traced attack and format its log
+        result, trace = self.generate_trace()
+        self.log = trace.format()
+        return result, self.log
+
+    def generate_trace(self):
+        """Generate a single attack resolution with a structured trace of its phases.
+
+        Returns:
+            tuple: The result tuple of damage (int) and combo achieved (bool), and the
+                AttackTrace of the attack.
+        """
+        trace = AttackTrace()
+        self.trace = trace
+        try:
+            result = self._resolve_attack()
+        finally:
+            # Only the requested attack is traced
+            self.trace = None
+        return result, trace
+
+    def export_traces(self, num_attacks, path):
+        """Resolve a number of traced attacks and stream each trace to a JSON Lines
+        file as it is generated.
+
+        Args:
+            num_attacks (int): The number of attacks to trace.
+            path (str): The file to write, with one JSON object per attack.
+        """
+        import json
+        with open(path, 'w') as file:
+            for _ in range(num_attacks):
+                _, trace = self.generate_trace()
+                file.write(json.dumps(trace.to_dict()) + '\n')
+
+    def enable_profiling(self):
+        """Start collecting per-phase call counts, cumulative time and dice touched
+        for the attacks resolved by the scalar engine in this process. Seeded runs
+        and compare resolve attacks on copies of the players, which aren't profiled.
+
+        Returns:
+            PhaseProfiler: The profiler, whose get_report gives the collected data.
+        """
+        from profiling import PhaseProfiler
+        if self.profiler is None:
+            self.profiler = PhaseProfiler()
+            self.profiler.attach(self.attacker, self.defender)
+            # The compiled steps hold the players' unwrapped methods
+            self._compiled.clear()
+        return self.profiler
 
-    def generate_results(self, num_sims):
+    def disable_profiling(self):
+        """Stop profiling, so attacks are resolved without any instrumentation.
+
+        Returns:
+            PhaseProfiler: The profiler holding the data collected so far, or None if
+                profiling wasn't enabled.
+        """
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.detach()
+            self.profiler = None
+            self._compiled.clear()
+        return profiler
+
+    def generate_results(self, num_sims, engine='scalar', seed=None, workers=1):
         """Generate a list of tuples with damage outputs and whether the combo was
         achieved for attacks, simulated a number of times.
 
         Args:
             num_sims (int): The number of times to simulate the attack.
+            engine (str, optional): 'scalar' to resolve each attack in turn or
+                'batch' to resolve them all at once with NumPy arrays.
+                Defaults to 'scalar'.
+            seed (int, optional): A master seed for reproducible results, which are
+                identical for any number of workers. Defaults to None.
+            workers (int, optional): The number of processes to split the attacks
+                across. Defaults to 1.
+
+        Raises:
+            ValueError: If the engine is not recognised.
 
         Returns:
             list[tuple]: A list of tuples with each damage output (int) and
                 whether the combo was achieved (bool).
         """
-        return [self._resolve_attack() for _ in range(num_sims)]
+        if seed is not None or workers > 1:
+            return run_seeded(self.attacker, self.defender, num_sims,
+                              self._get_seed(seed), workers, engine,
+                              steps=self.steps)
+        if engine == 'scalar':
+            return [self._resolve_attack() for _ in range(num_sims)]
+        elif engine == 'batch':
+            # Only import NumPy when the batch engine is used
+            from batch import BatchEngine
+            engine = BatchEngine(self.attacker, self.defender, steps=self.steps)
+            damage, combos = engine.run(num_sims)
+            return list(zip(damage.tolist(), combos.tolist()))
+        else:
+            raise ValueError(f'Unknown engine: {engine!r}')
+
+    def generate_result_array(self, num_sims, engine='batch'):
+        """Generate the results of attacks, simulated a number of times, as a compact
+        ResultArray rather than a list of tuples.
+
+        Args:
+            num_sims (int): The number of times to simulate the attack.
+            engine (str, optional): 'scalar' or 'batch', as for generate_results.
+                Defaults to 'batch'.
+
+        Raises:
+            ValueError: If the engine is not recognised.
+
+        Returns:
+            ResultArray: The damage output and whether the combo was achieved for
+                each attack.
+        """
+        from results import ResultArray
+        # The damage can't be more than the attacker's dice after crits explode
+        max_damage = 2 * self.attacker.num_dice
+        if engine == 'scalar':
+            import numpy as np
+
+            def scalar_chunks(chunk_size=8192):
+                for start in range(0, num_sims, chunk_size):
+                    damage, combos = zip(*(self._resolve_attack() for _ in
+                                           range(min(chunk_size, num_sims - start))))
+                    yield np.array(damage), np.array(combos)
+            chunks = scalar_chunks()
+        elif engine == 'batch':
+            from batch import BatchEngine
+            chunks = BatchEngine(self.attacker, self.defender,
+                                 steps=self.steps).iter_chunks(num_sims)
+        else:
+            raise ValueError(f'Unknown engine: {engine!r}')
+        return ResultArray.from_chunks(num_sims, chunks, max_damage)
+
+    def generate_combo_rates(self, num_sims):
+        """Simulate attacks a number of times and find how often each of the
+        attacker's tracked combos is achieved, so many combos are compared using the
+        same set of attacks.
+
+        Args:
+            num_sims (int): The number of times to simulate the attack.
+
+        Returns:
+            dict: Each tracked combo (tuple[str]) mapped to its success rate (float).
+        """
+        successes = [0] * len(self.attacker.tracked_combos)
+        for _ in range(num_sims):
+            self._resolve_attack()
+            for index, achieved in enumerate(self.attacker.check_tracked_combos()):
+                successes[index] += achieved
+        return {tuple(combo): count / num_sims for combo, count in
+                zip(self.attacker.tracked_combos, successes)}
+
+    def accumulate_results(self, num_sims, engine='scalar', accumulator=None,
+                           seed=None, workers=1):
+        """Simulate attacks a number of times and count the results into an
+        accumulator as they are generated, rather than keeping a list of results.
+
+        Args:
+            num_sims (int): The number of times to simulate the attack.
+            engine (str, optional): 'scalar' or 'batch', as for generate_results.
+                Defaults to 'scalar'.
+            accumulator (ResultAccumulator, optional): The accumulator to add to.
+                Defaults to a new, empty accumulator.
+            seed (int, optional): A master seed, as for generate_results.
+                Defaults to None.
+            workers (int, optional): The number of processes to split the attacks
+                across. Defaults to 1.
+
+        Raises:
+            ValueError: If the engine is not recognised.
+
+        Returns:
+            ResultAccumulator: The accumulator holding the results.
+        """
+        if accumulator is None:
+            accumulator = ResultAccumulator()
+        if seed is not None or workers > 1:
+            accumulator.merge(run_seeded(self.attacker, self.defender, num_sims,
+                                         self._get_seed(seed), workers, engine,
+                                         accumulate=True, steps=self.steps))
+        elif engine == 'scalar':
+            for _ in range(num_sims):
+                accumulator.add(*self._resolve_attack())
+        elif engine == 'batch':
+            from batch import BatchEngine
+            BatchEngine(self.attacker, self.defender,
+                        steps=self.steps).accumulate(num_sims, accumulator)
+        else:
+            raise ValueError(f'Unknown engine: {engine!r}')
+        return accumulator
 
-    def _resolve_attack(self):
-        """Resolve the attack by calling methods on the attacker and defender objects.
+    def compare(self, variants, num_sims, seed=None):
+        """Compare variants of the attack with this one, e.g. with cover or one more
+        reroll, using common random numbers. For each attack, every variant's attacker
+        and defender are reseeded to the same values as this simulation's, so the
+        variants roll the same dice wherever they roll the same number of dice, and
+        the paired differences have far less noise than independent runs.
+
+        Args:
+            variants (list[tuple]): Each variant's Attacker and Defender objects,
+                where None keeps this simulation's player.
+            num_sims (int): The number of times to simulate the attacks.
+            seed (int, optional): A master seed for reproducible results.
+                Defaults to None.
+
+        Returns:
+            list[tuple]: For each variant, the PairedDifference of its damage and of
+                whether its combo was achieved, each minus this simulation's.
+        """
+        # Copy the players so the caller's random number generators are left alone,
+        # with one generator per side shared by every variant
+        attacker_rng = random.Random()
+        defender_rng = random.Random()
+        simulations = []
+        for attacker, defender in [(self.attacker, self.defender)] + list(variants):
+            attacker = copy.copy(attacker or self.attacker)
+            defender = copy.copy(defender or self.defender)
+            attacker.rng = attacker_rng
+            defender.rng = defender_rng
+            simulations.append(Simulation(attacker, defender, self.steps))
+        differences = [(PairedDifference(), PairedDifference()) for _ in variants]
+
+        seeds = random.Random(self._get_seed(seed))
+        for _ in range(num_sims):
+            attacker_seed = seeds.getrandbits(64)
+            defender_seed = seeds.getrandbits(64)
+            results = []
+            for simulation in simulations:
+                attacker_rng.seed(attacker_seed)
+                defender_rng.seed(defender_seed)
+                results.append(simulation._resolve_attack())
+            base_damage, base_combo = results[0]
+            for (damage, combo), (damage_difference, combo_difference) in zip(
+                    results[1:], differences):
+                damage_difference.add(damage - base_damage)
+                combo_difference.add(combo - base_combo)
+        return differences
+
+    def generate_until_precise(self, mean_precision=None, combo_precision=None,
+                               tail=None, confidence=0.95, chunk_size=1000,
+                               max_sims=10000000, engine='scalar', seed=None):
+        """Simulate attacks in chunks until the confidence intervals of the requested
+        statistics are narrow enough, instead of choosing the number of sims up front.
+
+        Args:
+            mean_precision (float, optional): The largest allowed half-width of the
+                interval for the mean damage, which is only checked once at least
+                MIN_VARIED_ATTACKS attacks differ from the most common damage.
+                Defaults to None.
+            combo_precision (float, optional): The largest allowed half-width of the
+                interval for the combo success rate. Defaults to None.
+            tail (tuple, optional): A damage (int) and the largest allowed half-width
+                (float) of the interval for the probability of dealing at least that
+                damage. Defaults to None.
+            confidence (float, optional): The confidence level of the intervals.
+                Defaults to 0.95.
+            chunk_size (int, optional): The number of attacks simulated between
+                checks. Defaults to 1000.
+            max_sims (int, optional): The most attacks to simulate before giving up.
+                Defaults to 10000000.
+            engine (str, optional): 'scalar' or 'batch', as for generate_results.
+                Defaults to 'scalar'.
+            seed (int, optional): A master seed for reproducible results.
+                Defaults to None.
+
+        Raises:
+            ValueError: If no precision is requested.
+
+        Returns:
+            tuple: The ResultAccumulator holding the results, whose total is the number
+                of sims used, and whether the requested precision was reached (bool).
+        """
+        if mean_precision is None and combo_precision is None and tail is None:
+            raise ValueError('At least one precision must be requested')
+        # Each chunk gets its own seed drawn from the master seed
+        seeds = random.Random(seed) if seed is not None else None
+
+        def half_width(interval):
+            return (interval[1] - interval[0]) / 2
+
+        accumulator = ResultAccumulator()
+        while accumulator.total < max_sims:
+            self.accumulate_results(min(chunk_size, max_sims - accumulator.total),
+                                    engine, accumulator,
+                                    seeds.randrange(2 ** 32) if seeds else None)
+            precise = True
+            if mean_precision is not None:
+                varied = accumulator.total - max(accumulator.damage_counts)
+                precise &= (varied >= MIN_VARIED_ATTACKS and
+                            half_width(accumulator.mean_interval(confidence)) <=
+                            mean_precision)
+            if combo_precision is not None:
+                precise &= (half_width(accumulator.combo_rate_interval(confidence)) <=
+                            combo_precision)
+            if tail is not None:
+                precise &= (half_width(accumulator.probability_at_least_interval(
+                    tail[0], confidence)) <= tail[1])
+            if precise:
+                return accumulator, True
+        return accumulator, False
+
+    def estimate_probability(self, num_sims, min_damage=None, require_combo=False,
+                             require_pierce=False, pilot_fraction=0.1):
+        """Estimate the probability of a rare outcome, e.g. dealing at least 8 damage,
+        by sampling attacks in strata of the number of crits and wilds the attacker
+        rolls, initially and when crits explode. Strata which can't deal enough
+        damage are skipped, and a pilot run samples the rest evenly to decide how to
+        split the remaining attacks, which mostly go to the strata which most affect
+        the outcome. Each stratum is weighted by its exact probability, so for
+        outcomes decided by rare rolls this gives much tighter estimates than
+        simulating the same number of attacks.
+
+        Args:
+            num_sims (int): The number of attacks to simulate, including the pilot
+                run. It must be at least 3 per stratum sampled, i.e. 1 pilot attack
+                and 2 further attacks.
+            min_damage (int, optional): The least damage for the outcome.
+                Defaults to None.
+            require_combo (bool, optional): Whether the outcome needs the combo to be
+                achieved. Defaults to False.
+            require_pierce (bool, optional): Whether the outcome needs pierce to be
+                applied. Defaults to False.
+            pilot_fraction (float, optional): The share of the attacks used for the
+                pilot run. Defaults to 0.1.
+
+        Raises:
+            ValueError: If no condition for the outcome is given, or num_sims is too
+                few for the number of strata.
+
+        Returns:
+            StratifiedEstimator: The estimator holding the attacks after the pilot
+                run, whose estimate, standard_error and interval give the probability
+                of the outcome. Its total plus its pilot_total is num_sims.
+        """
+        from stratified import StratifiedEstimator
+        if min_damage is None and not require_combo and not require_pierce:
+            raise ValueError('At least one condition for the outcome must be given')
+
+        def sample(estimator, stratum, num_attacks):
+            for _ in range(num_attacks):
+                damage, combo = self._resolve_attack(stratum)
+                pierced = (require_pierce and self.attacker.status['pierce_on_wild'] and
+                           'wild' in self.attacker.dice_pool)
+                hit = ((min_damage is None or damage >= min_damage) and
+                       (combo or not require_combo) and
+                       (pierced or not require_pierce))
+                estimator.add(stratum, hit)
+
+        is_hexed = self.attacker.status['is_hexed']
+        pilot = StratifiedEstimator(self.attacker.num_dice, is_hexed)
+        estimator = StratifiedEstimator(self.attacker.num_dice, is_hexed)
+        if min_damage is not None:
+            # The damage can't be more than the attacker's dice after crits explode,
+            # so strata with too few crits are never sampled
+            for stratum in estimator.probabilities:
+                num_crits = 0 if is_hexed else stratum[0]
+                if self.attacker.num_dice + num_crits < min_damage:
+                    pilot.exclude(stratum)
+                    estimator.exclude(stratum)
+        strata = estimator.get_strata()
+        if not strata:
+            return estimator
+
+        # Each stratum needs 1 pilot attack and 2 further attacks for its variance
+        if num_sims < 3 * len(strata):
+            raise ValueError(f'num_sims must be at least {3 * len(strata)} to sample '
+                             f'{len(strata)} strata, not {num_sims}')
+        # The pilot can't take the attacks needed for the further minimum
+        pilot_sims = min(int(num_sims * pilot_fraction), num_sims - 2 * len(strata))
+        for stratum in strata:
+            sample(pilot, stratum, max(pilot_sims // len(strata), 1))
+        # The pilot attacks only decide the allocation, as counting them in the
+        # estimate would bias it (strata with unlucky pilots would get fewer attacks)
+        estimator.pilot_total = pilot.total
+        for stratum, num_attacks in pilot.allocate(num_sims - pilot.total,
+                                                   minimum=2).items():
+            sample(estimator, stratum, num_attacks)
+        return estimator
+
+    def generate_distribution(self, num_sims, engine='scalar', cache=None):
+        """Generate the distribution of damage outputs and combo results for attacks,
+        simulated a number of times, reusing a cached distribution if available.
+
+        Args:
+            num_sims (int): The number of times to simulate the attack.
+            engine (str, optional): The engine passed to generate_results.
+                Defaults to 'scalar'.
+            cache (ResultCache, optional): A cache of distributions from earlier
+                simulations. Defaults to None.
+
+        Returns:
+            dict: Each (damage (int), combo achieved (bool)) result mapped to the
+                number of attacks with that result.
+        """
+        def simulate():
+            return self.accumulate_results(num_sims, engine).to_distribution()
+
+        if cache is None:
+            return simulate()
+        return cache.get_or_compute(self.get_config_key() + (num_sims,), simulate)
+
+    def get_config_key(self):
+        """Get a canonical hashable key for the attacker and defender configurations,
+        and the steps of the attack if they aren't the standard ones.
+
+        Returns:
+            tuple: The attacker's and defender's configuration keys, followed by the
+                names of the steps (tuple[str]) if custom steps were given.
+        """
+        key = (self.attacker.get_config_key(), self.defender.get_config_key())
+        # Custom steps, e.g. with a new ability, can change the results
+        if self.steps is not None:
+            key += (tuple(step.name for step in self.steps),)
+        return key
+
+    def calculate_exact(self):
+        """Calculate the exact damage distribution and combo probability rather than
+        simulating attacks.
+
+        Returns:
+            tuple: A dict of each damage output (int) mapped to its probability
+                (float), and the probability of the combo being achieved (float).
+        """
+        from exact import ExactEngine
+        engine = ExactEngine(self.attacker, self.defender)
+        return engine.get_damage_pmf(), engine.get_combo_probability()
+
+    def calculate_from_table(self, table, num_sims=10000, engine='scalar'):
+        """Look up the damage distribution in a precomputed outcome table, falling
+        back to simulating attacks if the attacker or defender isn't in the table.
+
+        Args:
+            table (OutcomeTable): The table, e.g. OutcomeTable('outcomes.bin').
+            num_sims (int, optional): The number of times to simulate the attack if
+                falling back. Defaults to 10000.
+            engine (str, optional): 'scalar' or 'batch', as for generate_results.
+                Defaults to 'scalar'.
+
+        Returns:
+            tuple: A dict of each damage output (int) mapped to its probability
+                (float), and the probability of the combo being achieved (float),
+                which are exact if found in the table and estimated otherwise.
+        """
+        pmf = table.get_matchup(self.attacker, self.defender)
+        if pmf is not None:
+            # Attackers with a combo aren't in the table
+            return pmf, 0.0
+        accumulator = self.accumulate_results(num_sims, engine)
+        return ({damage: count / accumulator.total
+                 for damage, count in accumulator.histogram().items()},
+                accumulator.combo_rate())
+
+    def _get_seed(self, seed):
+        """Get the master seed for a seeded run, choosing one if not given.
+
+        Args:
+            seed (int or None): The master seed.
+
+        Returns:
+            int: The master seed.
+        """
+        return random.randrange(2 ** 32) if seed is None else seed
+
+    def _resolve_attack(self, attacker_stratum=None):
+        """Resolve the attack by running the compiled steps, which call methods on
+        the attacker and defender objects.
+
+        Args:
+            attacker_stratum (tuple[int], optional): The number of crits and wilds the
+                attacker's initial roll and crit explosion are conditioned on, for
+                stratified sampling. Defaults to None, which rolls the attacker's dice
+                freely.
 
         Returns:
             tuple, str: A tuple of damage dealt to the defender by the attacker (int)
                 and whether the combo was achieved (bool).
         """
-        # ------Roll attacker's initial dice pool------
-        self.attacker.initial_roll()
-        # ------Roll defender's initial dice pool------
-        self.defender.initial_roll()
-
-        if self.logging:
-            self._print_status('initial roll')
-
-        # ------Resolve crits for attacker------
-        if not self.attacker.status['is_hexed']:
-            self.attacker.explode_crits()
-        # ------Resolve crits for defender------
-        if not self.defender.status['is_hexed']:
-            self.defender.explode_crits()
-
-        if self.logging:
-            self._print_status('crits exploded')
-            self.log += 'Current Damage Output (inc future cover application): '
-            self.log += f'{self._calculate_current_damage()}\n'
-
-        # ------Attacker modifies own dice------
-        # Resolve any all-or-nothing rerolls
-        if self.attacker.status['dr_strange_reroll']:
-            self.attacker.decide_dr_strange_reroll(self._calculate_current_damage())
-        # Resolve any standard rerolls
-        if self.attacker.num_rerolls > 0:
-            self.attacker.reroll()
-
-        # ------Defender modifies own dice------
-        # Resolve any all-or-nothing rerolls
-        if self.defender.status['dr_strange_reroll']:
-            self.defender.decide_dr_strange_reroll(self._calculate_current_damage())
-        # Resolve any standard rerolls
-        if self.defender.num_rerolls > 0:
-            self.defender.reroll()
-
-        if self.logging:
-            self._print_status('rerolls')
-
-        # Apply cover
-        if self.defender.status['has_cover']:
-            self.defender.apply_cover()
-            if self.logging:
-                self._print_status('cover applied')
-
-        # ------Attacker modifies defender's dice------
-        # Apply pierce if attacker rolled a wild
-        if (self.attacker.status['pierce_on_wild'] and
-                'wild' in self.attacker.dice_pool):
-            self.defender.apply_pierce()
-            if self.logging:
-                self._print_status('pierce applied')
-
-        # ------Defender modifies attacker's dice------
-        # Nothing here yet
-
-        if self.logging:
-            self.log += f'Final Damage Output: {self._calculate_damage()}'
-
-        # ------Calculate results------
+        attacker = self._attacker
+        defender = self._defender
+        # The steps are compiled for the mode and the player settings which decide
+        # whether each step applies, so changing a setting between attacks (e.g. the
+        # number of rerolls) takes effect
+        key = (self.trace is not None, attacker_stratum is not None,
+               attacker.num_rerolls, defender.num_rerolls, len(attacker.combo),
+               tuple(attacker.status.values()), tuple(defender.status.values()))
+        steps = self._compiled.get(key)
+        if steps is None:
+            steps = self._compile(key)
+        self.attacker_stratum = attacker_stratum
         # Default result to return if no combo was provided
-        combo_result = False
-        # If a special combo was provided, get the bool
-        if len(self.attacker.combo) > 0:
-            combo_result = self.attacker.check_combo()
-            if self.logging:
-                self.log += f'\nCombo Achieved: {combo_result}'
+        self.combo_result = False
+        for step in steps:
+            step()
 
         # Return damage and combo bool as a tuple
-        return (self._calculate_damage(), combo_result)
+        return (self._calculate_damage(), self.combo_result)
+
+    def _compile(self, key):
+        """Compile the steps needed for the players in a mode of resolving attacks.
+
+        Args:
+            key (tuple): Whether the attack is traced and whether the attacker's roll
+                is stratified (bool), followed by the player settings the steps
+                depend on.
+
+        Returns:
+            list[function]: The compiled steps.
+        """
+        traced, stratified = key[:2]
+        modes = frozenset(mode for mode, active in (('traced', traced),
+                                                    ('stratified', stratified))
+                          if active)
+        self._compiled[key] = compile_scalar(self.get_steps(), self, modes)
+        return self._compiled[key]
+
+    def get_steps(self):
+        """Get the declared steps of the attack.
+
+        Returns:
+            tuple[Step]: The steps, in order.
+        """
+        return STEPS if self.steps is None else self.steps
 
     def _print_status(self, phase):
-        """Add the relevant message to the log.
+        """Record the dice pools after a phase in the trace.
 
         Args:
             phase (str): The phase of the attack which is being logged.
         """
-        # Don't log the pierce and cover phases for the attacker (dice are not modified)
-        if phase != 'pierce applied' and phase != 'cover applied':
-            self.log += f'Attacker dice pool after {phase}: {self.attacker.dice_pool}\n'
-        self.log += f'Defender dice pool after {phase}: {self.defender.dice_pool}\n'
+        self.trace.record_pools(phase, self.attacker, self.defender,
+                                self._calculate_damage())
 
     def _calculate_current_damage(self):
         """Calculate the current damage being dealt by the attacker to the defender
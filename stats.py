@@ -0,0 +1,327 @@
+import math
+
+
+class ResultAccumulator():
+    """A streaming summary of attack results. Each result is counted into a damage
+    histogram with the number of combos achieved at each damage, so the memory used
+    depends on the highest damage rather than the number of attacks.
+    """
+
+    def __init__(self):
+        """Initialise an empty accumulator.
+        """
+        # The number of attacks dealing each damage (by index)
+        self.damage_counts = []
+        # The number of attacks achieving the combo at each damage (by index)
+        self.combo_counts = []
+        self.total = 0
+
+    def add(self, damage, combo):
+        """Add the result of one attack.
+
+        Args:
+            damage (int): The damage dealt.
+            combo (bool): Whether the combo was achieved.
+        """
+        if damage >= len(self.damage_counts):
+            self._extend(damage + 1)
+        self.damage_counts[damage] += 1
+        self.combo_counts[damage] += combo
+        self.total += 1
+
+    def update(self, results):
+        """Add the results of several attacks.
+
+        Args:
+            results (iterable[tuple]): Each damage output (int) and whether the combo
+                was achieved (bool).
+        """
+        for damage, combo in results:
+            self.add(damage, combo)
+
+    def add_counts(self, damage_counts, combo_counts):
+        """Add already counted results, e.g. from another process.
+
+        Args:
+            damage_counts (list[int]): The number of attacks dealing each damage.
+            combo_counts (list[int]): The number of attacks achieving the combo at
+                each damage.
+        """
+        if len(damage_counts) > len(self.damage_counts):
+            self._extend(len(damage_counts))
+        for damage, count in enumerate(damage_counts):
+            self.damage_counts[damage] += count
+            self.total += count
+        for damage, count in enumerate(combo_counts):
+            self.combo_counts[damage] += count
+
+    def merge(self, other):
+        """Add all results from another accumulator.
+
+        Args:
+            other (ResultAccumulator): The accumulator to merge in.
+        """
+        self.add_counts(other.damage_counts, other.combo_counts)
+
+    def mean(self):
+        """Get the mean damage.
+
+        Returns:
+            float: The mean damage.
+        """
+        return sum(damage * count for damage, count in
+                   enumerate(self.damage_counts)) / self.total
+
+    def variance(self):
+        """Get the sample variance of the damage.
+
+        Returns:
+            float: The sample variance, or 0 with fewer than 2 attacks.
+        """
+        if self.total < 2:
+            return 0.0
+        mean = self.mean()
+        return sum(count * (damage - mean) ** 2 for damage, count in
+                   enumerate(self.damage_counts)) / (self.total - 1)
+
+    def median(self):
+        """Get the median damage, averaging the middle two for an even number of
+        attacks as statistics.median does.
+
+        Returns:
+            int or float: The median damage.
+        """
+        lower = self._value_at((self.total - 1) // 2)
+        upper = self._value_at(self.total // 2)
+        return lower if lower == upper else (lower + upper) / 2
+
+    def quantile(self, q):
+        """Get the smallest damage with at least a proportion of attacks dealing that
+        damage or less.
+
+        Args:
+            q (float): The proportion, between 0 and 1.
+
+        Returns:
+            int: The damage at the quantile.
+        """
+        return self._value_at(max(math.ceil(q * self.total) - 1, 0))
+
+    def min(self):
+        """Get the lowest damage dealt.
+
+        Returns:
+            int: The lowest damage.
+        """
+        return self._value_at(0)
+
+    def max(self):
+        """Get the highest damage dealt.
+
+        Returns:
+            int: The highest damage.
+        """
+        return self._value_at(self.total - 1)
+
+    def combo_rate(self):
+        """Get the proportion of attacks achieving the combo.
+
+        Returns:
+            float: The combo success rate.
+        """
+        return sum(self.combo_counts) / self.total
+
+    def probability_at_least(self, damage):
+        """Get the proportion of attacks dealing at least an amount of damage.
+
+        Args:
+            damage (int): The damage.
+
+        Returns:
+            float: The proportion of attacks.
+        """
+        return sum(self.damage_counts[max(damage, 0):]) / self.total
+
+    def mean_interval(self, confidence=0.95):
+        """Get a normal-approximation confidence interval for the mean damage.
+
+        Args:
+            confidence (float, optional): The confidence level. Defaults to 0.95.
+
+        Returns:
+            tuple[float]: The lower and upper bounds of the interval.
+        """
+        mean = self.mean()
+        half_width = _z_score(confidence) * math.sqrt(self.variance() / self.total)
+        return mean - half_width, mean + half_width
+
+    def combo_rate_interval(self, confidence=0.95):
+        """Get a Wilson score confidence interval for the combo success rate.
+
+        Args:
+            confidence (float, optional): The confidence level. Defaults to 0.95.
+
+        Returns:
+            tuple[float]: The lower and upper bounds of the interval.
+        """
+        return proportion_interval(sum(self.combo_counts), self.total, confidence)
+
+    def probability_at_least_interval(self, damage, confidence=0.95):
+        """Get a Wilson score confidence interval for the proportion of attacks
+        dealing at least an amount of damage.
+
+        Args:
+            damage (int): The damage.
+            confidence (float, optional): The confidence level. Defaults to 0.95.
+
+        Returns:
+            tuple[float]: The lower and upper bounds of the interval.
+        """
+        return proportion_interval(sum(self.damage_counts[max(damage, 0):]),
+                                   self.total, confidence)
+
+    def histogram(self):
+        """Get the number of attacks dealing each damage.
+
+        Returns:
+            dict: Each damage output (int) dealt mapped to its number of attacks.
+        """
+        return {damage: count for damage, count in enumerate(self.damage_counts)
+                if count > 0}
+
+    def to_distribution(self):
+        """Get the number of attacks with each damage and combo result.
+
+        Returns:
+            dict: Each (damage (int), combo achieved (bool)) result mapped to its
+                number of attacks.
+        """
+        distribution = {}
+        for damage, (count, combos) in enumerate(zip(self.damage_counts,
+                                                     self.combo_counts)):
+            if count > combos:
+                distribution[(damage, False)] = count - combos
+            if combos > 0:
+                distribution[(damage, True)] = combos
+        return distribution
+
+    def _extend(self, length):
+        """Extend the histograms to hold a number of damage values.
+
+        Args:
+            length (int): The new number of damage values.
+        """
+        extra = length - len(self.damage_counts)
+        self.damage_counts.extend([0] * extra)
+        self.combo_counts.extend([0] * extra)
+
+    def _value_at(self, position):
+        """Get the damage at a position in the sorted results.
+
+        Args:
+            position (int): The position, from 0 to total - 1.
+
+        Raises:
+            ValueError: If there are no results.
+
+        Returns:
+            int: The damage at the position.
+        """
+        if self.total == 0:
+            raise ValueError('No results have been added')
+        seen = 0
+        for damage, count in enumerate(self.damage_counts):
+            seen += count
+            if seen > position:
+                return damage
+
+
+class PairedDifference():
+    """A streaming summary of the differences between paired results, e.g. the damage
+    of the same attack under two variants resolved with the same random numbers.
+    Only the running sums are kept, so the memory used doesn't depend on the number
+    of pairs.
+    """
+
+    def __init__(self):
+        """Initialise an empty summary.
+        """
+        self.total = 0
+        self._sum = 0
+        self._sum_squares = 0
+
+    def add(self, difference):
+        """Add the difference of one pair.
+
+        Args:
+            difference (int or float): The variant's result minus the baseline's.
+        """
+        self.total += 1
+        self._sum += difference
+        self._sum_squares += difference * difference
+
+    def mean(self):
+        """Get the mean difference.
+
+        Returns:
+            float: The mean difference.
+        """
+        return self._sum / self.total
+
+    def variance(self):
+        """Get the sample variance of the differences.
+
+        Returns:
+            float: The sample variance, or 0 with fewer than 2 pairs.
+        """
+        if self.total < 2:
+            return 0.0
+        return max(self._sum_squares - self._sum ** 2 / self.total, 0) / (self.total - 1)
+
+    def mean_interval(self, confidence=0.95):
+        """Get a normal-approximation confidence interval for the mean difference.
+
+        Args:
+            confidence (float, optional): The confidence level. Defaults to 0.95.
+
+        Returns:
+            tuple[float]: The lower and upper bounds of the interval.
+        """
+        mean = self.mean()
+        half_width = _z_score(confidence) * math.sqrt(self.variance() / self.total)
+        return mean - half_width, mean + half_width
+
+
+def proportion_interval(successes, total, confidence=0.95):
+    """Get a Wilson score confidence interval for a proportion, which stays sensible
+    for proportions close to 0 or 1.
+
+    Args:
+        successes (int): The number of successes.
+        total (int): The number of trials.
+        confidence (float, optional): The confidence level. Defaults to 0.95.
+
+    Returns:
+        tuple[float]: The lower and upper bounds of the interval.
+    """
+    z = _z_score(confidence)
+    proportion = successes / total
+    denominator = 1 + z ** 2 / total
+    centre = (proportion + z ** 2 / (2 * total)) / denominator
+    half_width = (z * math.sqrt(proportion * (1 - proportion) / total +
+                                z ** 2 / (4 * total ** 2)) / denominator)
+    return centre - half_width, centre + half_width
+
+
+def _z_score(confidence):
+    """Get the two-sided standard normal critical value for a confidence level.
+
+    Args:
+        confidence (float): The confidence level, e.g. 0.95.
+
+    Returns:
+        float: The critical value.
+    """
+    # statistics is slow to import, so it is only imported when intervals are needed
+    from statistics import NormalDist
+    return NormalDist().inv_cdf((1 + confidence) / 2)
@@ -0,0 +1,202 @@
+import math
+from functools import lru_cache
+
+from faces import FACE_INDEX, FACE_PROBABILITIES
+from stats import _z_score
+
+# The probabilities of rolling a crit and a wild on a single die
+CRIT_PROBABILITY = FACE_PROBABILITIES[FACE_INDEX['crit']]
+WILD_PROBABILITY = FACE_PROBABILITIES[FACE_INDEX['wild']]
+
+
+def roll_probabilities(num_dice):
+    """Get the exact probability of each number of crits and wilds in a roll.
+
+    Args:
+        num_dice (int): The number of dice rolled.
+
+    Returns:
+        dict: Each (crits, wilds) pair (tuple[int]) mapped to its probability (float).
+    """
+    other_probability = 1 - CRIT_PROBABILITY - WILD_PROBABILITY
+    return {
+        (crits, wilds): (math.comb(num_dice, crits) * math.comb(num_dice - crits, wilds)
+                         * CRIT_PROBABILITY ** crits * WILD_PROBABILITY ** wilds
+                         * other_probability ** (num_dice - crits - wilds))
+        for crits in range(num_dice + 1) for wilds in range(num_dice - crits + 1)
+    }
+
+
+@lru_cache(maxsize=None)
+def stratum_probabilities(num_dice, is_hexed):
+    """Get the exact probability of each stratum of an attacker's roll, i.e. the
+    number of crits and wilds in the initial roll and on the dice rolled when those
+    crits explode.
+
+    Args:
+        num_dice (int): The number of dice being rolled initially.
+        is_hexed (bool): Whether the hex condition is applied, so crits don't explode.
+
+    Returns:
+        dict: Each (crits, wilds, exploded crits, exploded wilds) stratum
+            (tuple[int]) mapped to its probability (float).
+    """
+    probabilities = {}
+    for (crits, wilds), probability in roll_probabilities(num_dice).items():
+        if is_hexed:
+            probabilities[(crits, wilds, 0, 0)] = probability
+            continue
+        for (exploded_crits, exploded_wilds), exploded_probability in \
+                roll_probabilities(crits).items():
+            probabilities[(crits, wilds, exploded_crits, exploded_wilds)] = (
+                probability * exploded_probability)
+    return probabilities
+
+
+class StratifiedEstimator():
+    """Estimates the probability of an event from attacks sampled in strata of the
+    number of crits and wilds the attacker rolls (see stratum_probabilities). Each
+    stratum's hit rate is weighted by the exact probability of the stratum, so strata
+    can be sampled far more (or less) often than they are rolled, e.g. oversampling
+    the rare rolls with many crits which decide the chance of high damage.
+    """
+
+    def __init__(self, num_dice, is_hexed=False):
+        """Initialise an empty estimator.
+
+        Args:
+            num_dice (int): The number of dice in the attacker's initial roll.
+            is_hexed (bool, optional): Whether the attacker is hexed, so crits don't
+                explode. Defaults to False.
+        """
+        self.probabilities = stratum_probabilities(num_dice, is_hexed)
+        # The number of attacks sampled, and how many had the event, in each stratum
+        self.sims = dict.fromkeys(self.probabilities, 0)
+        self.hits = dict.fromkeys(self.probabilities, 0)
+        # Strata where the event can't happen, which are never sampled
+        self.excluded = set()
+        # The number of attacks spent deciding how to split the sampled attacks,
+        # which aren't counted in the estimate
+        self.pilot_total = 0
+
+    @property
+    def total(self):
+        """int: The number of attacks sampled across all strata."""
+        return sum(self.sims.values())
+
+    def exclude(self, stratum):
+        """Mark a stratum where the event can't happen, e.g. because the attacker
+        has too few dice to deal enough damage. It counts as having no hits and isn't
+        sampled, so no attacks are spent on it.
+
+        Args:
+            stratum (tuple[int]): The stratum.
+        """
+        self.excluded.add(stratum)
+
+    def get_strata(self):
+        """Get the strata which need sampling.
+
+        Returns:
+            list[tuple[int]]: The strata which haven't been excluded.
+        """
+        return [stratum for stratum in self.probabilities
+                if stratum not in self.excluded]
+
+    def add(self, stratum, hit):
+        """Add the result of one attack.
+
+        Args:
+            stratum (tuple[int]): The stratum the attack was sampled in.
+            hit (bool): Whether the event happened.
+        """
+        self.sims[stratum] += 1
+        self.hits[stratum] += hit
+
+    def estimate(self):
+        """Get the estimated probability of the event.
+
+        Raises:
+            ValueError: If a stratum has no attacks sampled.
+
+        Returns:
+            float: The sum of each stratum's hit rate weighted by its probability.
+        """
+        self._check_sampled()
+        return sum(self.probabilities[stratum] * self.hits[stratum] / self.sims[stratum]
+                   for stratum in self.get_strata())
+
+    def standard_error(self):
+        """Get the standard error of the estimated probability.
+
+        Raises:
+            ValueError: If a stratum has no attacks sampled.
+
+        Returns:
+            float: The standard error, combining the sample variance of each stratum.
+        """
+        self._check_sampled()
+        variance = 0.0
+        for stratum in self.get_strata():
+            sims = self.sims[stratum]
+            if sims > 1:
+                rate = self.hits[stratum] / sims
+                variance += (self.probabilities[stratum] ** 2 * rate * (1 - rate) /
+                             (sims - 1))
+        return math.sqrt(variance)
+
+    def interval(self, confidence=0.95):
+        """Get a normal approximation confidence interval for the probability.
+
+        Args:
+            confidence (float, optional): The confidence level. Defaults to 0.95.
+
+        Returns:
+            tuple: The lower and upper bounds (float), clipped to 0 and 1.
+        """
+        estimate = self.estimate()
+        margin = _z_score(confidence) * self.standard_error()
+        return (max(estimate - margin, 0.0), min(estimate + margin, 1.0))
+
+    def allocate(self, num_sims, minimum=0):
+        """Split further attacks across the strata in proportion to each stratum's
+        probability times its estimated standard deviation (Neyman allocation), which
+        gives the smallest variance for the number of attacks.
+
+        Args:
+            num_sims (int): The number of attacks to split.
+            minimum (int, optional): The least number of attacks for each stratum.
+                Defaults to 0.
+
+        Returns:
+            dict: Each stratum which needs sampling mapped to its number of attacks
+                (int).
+        """
+        weights = {}
+        for stratum in self.get_strata():
+            # Smooth the hit rate so strata with no hits (or no misses) yet still get
+            # some attacks
+            rate = (self.hits[stratum] + 0.5) / (self.sims[stratum] + 1)
+            weights[stratum] = (self.probabilities[stratum] *
+                                math.sqrt(rate * (1 - rate)))
+        total_weight = sum(weights.values())
+        # Split the attacks left after each stratum has its minimum
+        spare = num_sims - minimum * len(weights)
+        shares = {stratum: spare * weight / total_weight
+                  for stratum, weight in weights.items()}
+        allocation = {stratum: int(share) for stratum, share in shares.items()}
+        # Give the attacks lost to rounding down to the largest remainders
+        remainders = sorted(shares, key=lambda stratum: allocation[stratum] -
+                            shares[stratum])
+        for stratum in remainders[:spare - sum(allocation.values())]:
+            allocation[stratum] += 1
+        return {stratum: minimum + count for stratum, count in allocation.items()}
+
+    def _check_sampled(self):
+        """Check that every stratum which needs sampling has at least one attack.
+
+        Raises:
+            ValueError: If a stratum has no attacks sampled.
+        """
+        if not all(self.sims[stratum] for stratum in self.get_strata()):
+            raise ValueError('Every stratum needs at least one sampled attack')
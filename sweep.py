@@ -0,0 +1,65 @@
+from itertools import product
+
+from attacker import Attacker
+from defender import Defender
+from exact import ExactEngine
+
+
+def sweep(attacker_ranges, defender_ranges):
+    """Calculate the exact results of every combination of attacker and defender
+    constructor parameters. Each player configuration's dice outcomes are worked out
+    once and shared across every matchup it appears in, e.g. an attacker without a Dr
+    Strange reroll has the same post-reroll pool against every defender.
+
+    Args:
+        attacker_ranges (dict): Attacker constructor parameters mapped to a list of
+            values to try. Parameters not given use the constructor defaults.
+        defender_ranges (dict): Defender constructor parameters mapped to a list of
+            values to try.
+
+    Returns:
+        dict: Each (attacker parameters, defender parameters) pair, as tuples of the
+            values in the order of the ranges with any lists made into tuples (e.g. a
+            combo of (('hit', 'crit'), True)), mapped to a tuple of the damage PMF
+            (dict) and the combo probability (float).
+    """
+    # Player configurations shared by every engine in the sweep
+    sides = {}
+    attacker_names = list(attacker_ranges)
+    defender_names = list(defender_ranges)
+
+    grid = {}
+    for attacker_values in product(*attacker_ranges.values()):
+        attacker = Attacker(**dict(zip(attacker_names, attacker_values)))
+        for defender_values in product(*defender_ranges.values()):
+            defender = Defender(**dict(zip(defender_names, defender_values)))
+            engine = ExactEngine(attacker, defender, sides)
+            grid[(_freeze(attacker_values), _freeze(defender_values))] = (
+                engine.get_damage_pmf(), engine.get_combo_probability())
+    return grid
+
+
+def _freeze(value):
+    """Make a parameter value hashable by turning any lists in it into tuples.
+
+    Args:
+        value (object): The parameter value, e.g. a combo (['hit', 'crit'], True).
+
+    Returns:
+        object: The value with every list and tuple in it made a tuple.
+    """
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def mean_damage(pmf):
+    """Get the mean damage from a damage PMF.
+
+    Args:
+        pmf (dict): Each damage output (int) mapped to its probability (float).
+
+    Returns:
+        float: The mean damage.
+    """
+    return sum(damage * probability for damage, probability in pmf.items())
@@ -0,0 +1,253 @@
+import argparse
+import mmap
+import struct
+from itertools import product
+
+from attacker import Attacker
+from defender import Defender
+from exact import ExactEngine
+
+# The file header: magic bytes, format version, the largest number of dice and
+# rerolls in the table, and the number of probabilities in each entry
+HEADER = struct.Struct('<4sHHHH')
+MAGIC = b'MCPT'
+VERSION = 1
+
+# The configurations covered by default
+MAX_DICE = 10
+MAX_REROLLS = 3
+
+# The boolean constructor parameters of each player in the table, in index order
+ATTACKER_FLAGS = ('can_reroll_skulls', 'is_hexed', 'counts_blanks', 'counts_skulls')
+DEFENDER_FLAGS = ATTACKER_FLAGS + ('has_cover',)
+
+
+class OutcomeTable():
+    """A memory-mapped table of each player configuration's own outcome
+    distribution, built by build_table. Entries are fixed-size arrays of doubles at
+    offsets worked out from the configuration, so they are read lazily without an
+    index, and matchups between players in the table are answered by combining two
+    entries instead of simulating.
+
+    Players are in the table if they have 1 to max_dice dice, 0 to max_rerolls
+    rerolls and no Dr Strange reroll, and attackers also need no combo. Other
+    players depend on the other side's dice or have open-ended parameters.
+    """
+
+    def __init__(self, path):
+        """Open and memory-map a table file.
+
+        Args:
+            path (str): The table file.
+
+        Raises:
+            ValueError: If the file isn't a table of this version.
+        """
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.max_dice, self.max_rerolls, self._entry_size = \
+            HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f'{path!r} is not a version {VERSION} outcome table')
+        self._entry = struct.Struct(f'<{self._entry_size}d')
+        self._num_successes = self._entry_size // 2
+        self._defender_start = (HEADER.size + self._entry.size *
+                                _num_configs(self.max_dice, self.max_rerolls,
+                                             ATTACKER_FLAGS))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Close the memory map and the file.
+        """
+        self._map.close()
+        self._file.close()
+
+    def get_attacker(self, attacker):
+        """Get an attacker's outcome distribution.
+
+        Args:
+            attacker (Attacker): The Attacker object.
+
+        Returns:
+            dict: Each (successes (int), has wild (bool)) outcome mapped to its
+                probability (float), or None if the attacker isn't in the table.
+        """
+        config = attacker.get_config()
+        if config['combo'][0]:
+            return None
+        index = self._get_index(config, ATTACKER_FLAGS)
+        if index is None:
+            return None
+        entry = self._read(HEADER.size + index * self._entry.size)
+        return {(successes, bool(wild)): entry[wild * self._num_successes + successes]
+                for wild in (0, 1) for successes in range(self._num_successes)
+                if entry[wild * self._num_successes + successes] > 0}
+
+    def get_defender(self, defender):
+        """Get a defender's final successes distributions with and without pierce.
+
+        Args:
+            defender (Defender): The Defender object.
+
+        Returns:
+            tuple: The probability of each number of successes (list[float]) without
+                and with pierce, or None if the defender isn't in the table.
+        """
+        index = self._get_index(defender.get_config(), DEFENDER_FLAGS)
+        if index is None:
+            return None
+        entry = self._read(self._defender_start + index * self._entry.size)
+        return entry[:self._num_successes], entry[self._num_successes:]
+
+    def get_matchup(self, attacker, defender):
+        """Get the exact damage distribution of a matchup from the table.
+
+        Args:
+            attacker (Attacker): The Attacker object.
+            defender (Defender): The Defender object.
+
+        Returns:
+            dict: Each damage output (int) mapped to its probability (float), in
+                ascending order of damage, or None if either player isn't in the
+                table.
+        """
+        attack = self.get_attacker(attacker)
+        defence = self.get_defender(defender)
+        if attack is None or defence is None:
+            return None
+        pmf = {}
+        for (attack_successes, wild), probability in attack.items():
+            pierced = attacker.status['pierce_on_wild'] and wild
+            for defence_successes, defence_probability in enumerate(defence[pierced]):
+                if defence_probability > 0:
+                    damage = max(attack_successes - defence_successes, 0)
+                    pmf[damage] = (pmf.get(damage, 0.0) +
+                                   probability * defence_probability)
+        return dict(sorted(pmf.items()))
+
+    def _get_index(self, config, flags):
+        """Get the position of a player configuration in its part of the table.
+
+        Args:
+            config (dict): The player's constructor parameters.
+            flags (tuple[str]): The boolean parameters in the table for the player.
+
+        Returns:
+            int: The position, or None if the configuration isn't in the table.
+        """
+        if config['dr_strange_reroll'][0]:
+            return None
+        if not (1 <= config['num_dice'] <= self.max_dice and
+                0 <= config['num_rerolls'] <= self.max_rerolls):
+            return None
+        index = ((config['num_dice'] - 1) * (self.max_rerolls + 1) +
+                 config['num_rerolls'])
+        for flag in flags:
+            index = index * 2 + bool(config[flag])
+        return index
+
+    def _read(self, offset):
+        """Read an entry from the memory map.
+
+        Args:
+            offset (int): The position of the entry in the file.
+
+        Returns:
+            tuple[float]: The entry's probabilities.
+        """
+        return self._entry.unpack_from(self._map, offset)
+
+
+def build_table(path, max_dice=MAX_DICE, max_rerolls=MAX_REROLLS):
+    """Calculate the exact outcome distribution of every player configuration in the
+    table with the exact engine and write them to a table file.
+
+    Args:
+        path (str): The table file to write.
+        max_dice (int, optional): The largest number of dice. Defaults to MAX_DICE.
+        max_rerolls (int, optional): The largest number of rerolls.
+            Defaults to MAX_REROLLS.
+    """
+    # Crits can double the dice, so each entry holds up to 2 * max_dice successes
+    # for each of two cases (no wild and wild, or not pierced and pierced)
+    num_successes = 2 * max_dice + 1
+    entry = struct.Struct(f'<{2 * num_successes}d')
+    empty_attacker = Attacker(0)
+    empty_defender = Defender(0)
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, max_dice, max_rerolls,
+                               2 * num_successes))
+        for params in _iter_configs(max_dice, max_rerolls, ATTACKER_FLAGS):
+            values = [0.0] * (2 * num_successes)
+            engine = ExactEngine(Attacker(**params), empty_defender)
+            for (successes, wild, _), probability in \
+                    engine.get_attack_outcomes().items():
+                values[wild * num_successes + successes] += probability
+            file.write(entry.pack(*values))
+        for params in _iter_configs(max_dice, max_rerolls, DEFENDER_FLAGS):
+            values = [0.0] * (2 * num_successes)
+            engine = ExactEngine(empty_attacker, Defender(**params))
+            for pierced in (False, True):
+                for successes, probability in \
+                        engine.get_defence_outcomes(pierced).items():
+                    values[pierced * num_successes + successes] += probability
+            file.write(entry.pack(*values))
+
+
+def _iter_configs(max_dice, max_rerolls, flags):
+    """Give every player configuration in the table in index order.
+
+    Args:
+        max_dice (int): The largest number of dice.
+        max_rerolls (int): The largest number of rerolls.
+        flags (tuple[str]): The boolean parameters in the table for the player.
+
+    Yields:
+        dict: The constructor parameters of each configuration.
+    """
+    for num_dice, num_rerolls in product(range(1, max_dice + 1),
+                                         range(max_rerolls + 1)):
+        for values in product((False, True), repeat=len(flags)):
+            yield dict(zip(flags, values), num_dice=num_dice, num_rerolls=num_rerolls)
+
+
+def _num_configs(max_dice, max_rerolls, flags):
+    """Get the number of player configurations in the table.
+
+    Args:
+        max_dice (int): The largest number of dice.
+        max_rerolls (int): The largest number of rerolls.
+        flags (tuple[str]): The boolean parameters in the table for the player.
+
+    Returns:
+        int: The number of configurations.
+    """
+    return max_dice * (max_rerolls + 1) * 2 ** len(flags)
+
+
+def main(argv=None):
+    """Build a table file from the command line.
+
+    Args:
+        argv (list[str], optional): The arguments, or None to use sys.argv.
+            Defaults to None.
+    """
+    parser = argparse.ArgumentParser(
+        description='Precompute the outcome table of common player configurations.')
+    parser.add_argument('path', help='the table file to write')
+    parser.add_argument('--max-dice', type=int, default=MAX_DICE,
+                        help=f'the largest number of dice (default: {MAX_DICE})')
+    parser.add_argument('--max-rerolls', type=int, default=MAX_REROLLS,
+                        help=f'the largest number of rerolls (default: {MAX_REROLLS})')
+    args = parser.parse_args(argv)
+    build_table(args.path, args.max_dice, args.max_rerolls)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+import math
+
+import pytest
+
+from attacker import Attacker
+from defender import Defender
+from simulation import Simulation
+
+# The number of attacks simulated for each comparison
+NUM_SIMS = 20000
+# The most standard errors a simulated statistic may be from the exact value
+MAX_ERRORS = 5
+
+# Attacker and defender constructor parameters covering each rule
+MATCHUPS = [
+    ({'num_dice': 6, 'num_rerolls': 1, 'combo': (['hit', 'crit', 'wild'], True)},
+     {'num_dice': 3, 'has_cover': True}),
+    ({'num_dice': 4, 'num_rerolls': 2, 'can_reroll_skulls': True,
+      'pierce_on_wild': True},
+     {'num_dice': 4, 'num_rerolls': 1, 'counts_blanks': True}),
+    ({'num_dice': 5, 'is_hexed': True, 'counts_skulls': True,
+      'combo': (['hit', 'hit'], False), 'num_rerolls': 2},
+     {'num_dice': 2, 'is_hexed': True, 'has_cover': True}),
+    ({'num_dice': 3, 'dr_strange_reroll': (True, 2), 'pierce_on_wild': True},
+     {'num_dice': 3, 'dr_strange_reroll': (True, -1), 'can_reroll_skulls': True,
+      'num_rerolls': 1}),
+    ({'num_dice': 5, 'dr_strange_reroll': (True, -1), 'num_rerolls': 1,
+      'combo': (['wild', 'blank'], False)},
+     {'num_dice': 4, 'dr_strange_reroll': (True, 3), 'has_cover': True}),
+]
+
+# The options for how the players' dice are rolled and stored
+PLAYER_OPTIONS = {
+    'list': {},
+    'face counts': {'use_face_counts': True},
+    'alias tables': {'use_alias_tables': True},
+    'face counts and alias tables': {'use_face_counts': True, 'use_alias_tables': True},
+}
+
+
+def check_against_exact(simulation, accumulator):
+    """Check that simulated results agree with the exact engine.
+
+    Args:
+        simulation (Simulation): The simulation of the matchup.
+        accumulator (ResultAccumulator): The simulated results.
+    """
+    pmf, combo_probability = simulation.calculate_exact()
+    assert math.isclose(sum(pmf.values()), 1.0)
+    mean = sum(damage * probability for damage, probability in pmf.items())
+    variance = sum((damage - mean) ** 2 * probability
+                   for damage, probability in pmf.items())
+    assert (abs(accumulator.mean() - mean) <=
+            MAX_ERRORS * math.sqrt(variance / accumulator.total) + 1e-9)
+    assert (abs(accumulator.combo_rate() - combo_probability) <=
+            MAX_ERRORS * math.sqrt(combo_probability * (1 - combo_probability) /
+                                   accumulator.total) + 1e-9)
+
+
+@pytest.mark.parametrize('option', PLAYER_OPTIONS)
+@pytest.mark.parametrize('attacker_params, defender_params', MATCHUPS)
+def test_scalar_matches_exact(attacker_params, defender_params, option):
+    simulation = Simulation(Attacker(**attacker_params, **PLAYER_OPTIONS[option]),
+                            Defender(**defender_params, **PLAYER_OPTIONS[option]))
+    check_against_exact(simulation, simulation.accumulate_results(NUM_SIMS, seed=1))
+
+
+@pytest.mark.parametrize('attacker_params, defender_params', MATCHUPS)
+def test_batch_matches_exact(attacker_params, defender_params):
+    pytest.importorskip('numpy')
+    simulation = Simulation(Attacker(**attacker_params), Defender(**defender_params))
+    check_against_exact(simulation, simulation.accumulate_results(NUM_SIMS, 'batch',
+                                                                  seed=1))
@@ -0,0 +1,9 @@
+import pytest
+
+from attacker import Attacker
+from multitarget import MultiTargetSimulation
+
+
+def test_no_defenders_is_rejected():
+    with pytest.raises(ValueError, match='At least one defender is required'):
+        MultiTargetSimulation(Attacker(6), [])
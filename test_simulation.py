@@ -0,0 +1,41 @@
+import random
+
+from attacker import Attacker
+from defender import Defender
+from simulation import Simulation
+
+# The number of attacks simulated for each comparison
+NUM_SIMS = 2000
+
+
+def resolve_seeded(simulation, num_sims):
+    """Resolve attacks in this process with freshly seeded players, so runs of
+    simulations of the same matchup give the same results.
+
+    Args:
+        simulation (Simulation): The simulation.
+        num_sims (int): The number of attacks.
+
+    Returns:
+        list[tuple]: The damage (int) and combo result (bool) of each attack.
+    """
+    simulation.attacker.rng = random.Random(1)
+    simulation.defender.rng = random.Random(2)
+    return simulation.generate_results(num_sims)
+
+
+def test_replacing_a_player_recompiles_the_steps():
+    simulation = Simulation(Attacker(6), Defender(3))
+    simulation.generate_results(10)
+    simulation.defender = Defender(3, has_cover=True)
+    fresh = Simulation(Attacker(6), Defender(3, has_cover=True))
+    assert resolve_seeded(simulation, NUM_SIMS) == resolve_seeded(fresh, NUM_SIMS)
+
+
+def test_changing_a_player_setting_recompiles_the_steps():
+    simulation = Simulation(Attacker(6), Defender(3))
+    simulation.generate_results(10)
+    simulation.attacker.num_rerolls = 3
+    simulation.defender.status['has_cover'] = True
+    fresh = Simulation(Attacker(6, num_rerolls=3), Defender(3, has_cover=True))
+    assert resolve_seeded(simulation, NUM_SIMS) == resolve_seeded(fresh, NUM_SIMS)